@@ -0,0 +1,4 @@
+"""
+Benchmarks for the cross section pipeline, run from the repository root with
+``python -m benchmarks.<name>``.
+"""
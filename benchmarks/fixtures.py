@@ -0,0 +1,121 @@
+"""
+Full-size synthetic HRRR hybrid-level files on the exact HRRR grid.
+
+    python -m benchmarks.fixtures hrrr.synthetic.nc [--levels 50]
+    python -m benchmarks.fixtures hrrr.t18z.wrfnatf16.grib2 --format grib
+
+NetCDF fixtures are laid out the way cfgrib presents a ``wrfnat`` file
+(``hybrid``/``y``/``x`` dimensions, 2D ``latitude``/``longitude``, ``time`` and
+``valid_time``), so PathReader opens either kind. Fields are generated and
+written a level at a time, so memory stays at a few grid levels regardless of
+the level count.
+"""
+
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from xsection import HRRRGrid
+
+from .synthetic import synthetic_columns
+
+
+VARIABLES = ('pres', 't', 'q', 'u', 'v', 'w')
+INIT = datetime(2022, 12, 24, 18)
+HOUR = 16
+
+#GRIB2 (discipline, category, number) of each variable
+GRIB_PARAMETERS = {'pres': (0, 3, 0), 't': (0, 0, 0), 'q': (0, 1, 0), 'u': (0, 2, 2), 'v': (0, 2, 3), 'w': (0, 2, 8)}
+
+
+def surface_pressure(grid):
+    """Surface pressure (Pa) over the grid, with a Rockies-like ridge and a lower Appalachian one."""
+    x = (grid.x - grid.x[0])/(grid.x[-1] - grid.x[0])
+    y = (grid.y - grid.y[0])/(grid.y[-1] - grid.y[0])
+    xx, yy = np.meshgrid(x, y)
+    rockies = 28000*np.exp(-((xx - 0.3 - 0.05*np.sin(6*yy))/0.08)**2)
+    appalachians = 8000*np.exp(-((xx - 0.78 + 0.15*yy)/0.04)**2)*np.clip(1.2 - yy, 0, 1)
+    return 101500 - rockies - appalachians
+
+
+def levels(grid=None, count=50, seed=0):
+    """Yield ``(k, fields)`` for each hybrid level, fields as float32 ``(ny, nx)`` arrays."""
+    ps = surface_pressure(grid or HRRRGrid())
+    for k in range(count):
+        fields = synthetic_columns(ps, count, seed + k, k=k)
+        yield k, {name: data[0] for name, data in fields.items()}
+
+
+def write_netcdf(filename, count=50, grid=None, seed=0):
+    """Write a synthetic hybrid-level NetCDF fixture and return its path."""
+    import netCDF4
+
+    grid = grid or HRRRGrid()
+    ny, nx = grid.shape
+    lat, lon = grid.unproject(*np.meshgrid(grid.x, grid.y))
+    with netCDF4.Dataset(filename, 'w') as nc:
+        nc.createDimension('hybrid', count)
+        nc.createDimension('y', ny)
+        nc.createDimension('x', nx)
+        nc.createVariable('hybrid', 'f8', ('hybrid',))[:] = np.arange(1, count+1)
+        nc.createVariable('latitude', 'f8', ('y', 'x'))[:] = lat
+        nc.createVariable('longitude', 'f8', ('y', 'x'))[:] = lon % 360
+        for name, value in (('time', INIT), ('valid_time', INIT + timedelta(hours=HOUR))):
+            var = nc.createVariable(name, 'i8', ())
+            var.units = 'seconds since 1970-01-01T00:00:00'
+            var.calendar = 'proleptic_gregorian'
+            var[...] = int((value - datetime(1970, 1, 1)).total_seconds())
+        out = {}
+        for name in VARIABLES:
+            out[name] = nc.createVariable(name, 'f4', ('hybrid', 'y', 'x'), chunksizes=(1, ny, nx))
+            out[name].coordinates = 'time valid_time latitude longitude'
+        for k, fields in levels(grid, count, seed):
+            for name, data in fields.items():
+                out[name][k] = data
+    return filename
+
+
+def write_grib(filename, count=50, grid=None, seed=0):
+    """Write a synthetic hybrid-level GRIB2 fixture (Lambert Conformal, 16-bit packing) and return its path."""
+    import eccodes
+
+    grid = grid or HRRRGrid()
+    ny, nx = grid.shape
+    lat0, lon0 = grid.unproject(grid.x[0], grid.y[0])
+    kw = grid.crs_kw
+    with open(filename, 'wb') as f:
+        for k, fields in levels(grid, count, seed):
+            for name, data in fields.items():
+                discipline, category, number = GRIB_PARAMETERS[name]
+                h = eccodes.codes_grib_new_from_samples('GRIB2')
+                settings = [('gridDefinitionTemplateNumber', 30), ('dataDate', int(INIT.strftime('%Y%m%d'))), ('dataTime', INIT.hour*100),
+                            ('Nx', nx), ('Ny', ny), ('DxInMetres', 3000), ('DyInMetres', 3000),
+                            ('latitudeOfFirstGridPointInDegrees', float(lat0)), ('longitudeOfFirstGridPointInDegrees', float(lon0) % 360),
+                            ('LoVInDegrees', kw['central_longitude']), ('LaDInDegrees', kw['central_latitude']),
+                            ('Latin1InDegrees', kw['standard_parallels'][0]), ('Latin2InDegrees', kw['standard_parallels'][1]),
+                            ('discipline', discipline), ('parameterCategory', category), ('parameterNumber', number),
+                            ('shapeOfTheEarth', 5), ('jScansPositively', 1), ('typeOfFirstFixedSurface', 105), ('level', k+1), ('stepUnits', 1), ('forecastTime', HOUR), ('bitsPerValue', 16)]
+                for key, value in settings:
+                    eccodes.codes_set(h, key, value)
+                eccodes.codes_set_values(h, data.astype(np.float64).ravel())
+                eccodes.codes_write(h, f)
+                eccodes.codes_release(h)
+    return filename
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('output', help='file to write')
+    parser.add_argument('--format', choices=['netcdf', 'grib'], default=None, help='default: from the extension')
+    parser.add_argument('--levels', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ('netcdf' if args.output.endswith('.nc') else 'grib')
+    write = write_netcdf if fmt == 'netcdf' else write_grib
+    print(write(args.output, args.levels, seed=args.seed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Check that the float32 data path stays within plotting tolerance of float64.
+
+    python -m benchmarks.precision hrrr.t18z.wrfnatf16.grib2 [--sampling bilinear] [--vertical pressure]
+
+One path is extracted twice, once in the default float32 mode and once with
+XSECTION_FLOAT64 set, and every plotted quantity is derived from both. Values
+are clipped to the range each quantity is drawn over (beyond it the fill is
+saturated) and compared against half a fill bin, the smallest difference that
+could change a pixel. Exits with status 1 if any quantity is out of tolerance.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from xsection import PRODUCTS, PathReader, Route, relative_humidity, remap_section, theta_e
+from xsection.section import FLOAT64_ENV
+
+
+#Plotted quantity -> (function of a section, (low, high) drawn range, tolerance)
+QUANTITIES = {
+    'temperature (F)': (lambda s: (s['t']-273.15)*(9/5)+32, (PRODUCTS['temperature'].vmin, PRODUCTS['temperature'].vmax), 0.05),
+    'rh (%)': (lambda s: relative_humidity(s['t'], s['pres'], s['q']), (PRODUCTS['rh'].vmin, PRODUCTS['rh'].vmax), 0.05),
+    'wind (mph)': (lambda s: np.hypot(s['u'], s['v'])*2.23694, (PRODUCTS['wind'].vmin, PRODUCTS['wind'].vmax), 0.05),
+    'along (mph)': (lambda s: s['along']*2.23694, (PRODUCTS['along'].vmin, PRODUCTS['along'].vmax), 0.05),
+    'normal (mph)': (lambda s: s['normal']*2.23694, (PRODUCTS['normal'].vmin, PRODUCTS['normal'].vmax), 0.05),
+    'theta-e (K)': (lambda s: theta_e(s['t'], s['pres']), (200, 400), 0.05),
+    'log pressure (hPa)': (lambda s: np.log(s['pres']/100), (-np.inf, np.inf), 1e-4),
+}
+
+VARIABLES = ['pres', 't', 'q', 'u', 'v', 'along', 'normal']
+
+
+def extract(filename, route, sampling, vertical, float64):
+    """Section of ``route`` through ``filename`` in the float32 or float64 mode."""
+    if float64:
+        os.environ[FLOAT64_ENV] = '1'
+    else:
+        os.environ.pop(FLOAT64_ENV, None)
+    try:
+        with PathReader(filename) as reader:
+            section = reader.extract_plan(route.plan(sampling=sampling), VARIABLES)
+        return remap_section(section, vertical)
+    finally:
+        os.environ.pop(FLOAT64_ENV, None)
+
+
+def compare(filename, route, sampling='nearest', vertical='native'):
+    """Records of the float32 vs float64 difference of every plotted quantity."""
+    single = extract(filename, route, sampling, vertical, False)
+    double = extract(filename, route, sampling, vertical, True)
+    records = [{'quantity': 'fields', 'float32_bytes': sum(d.nbytes for d in single.fields.values()),
+                'float64_bytes': sum(d.nbytes for d in double.fields.values())}]
+    for name, (func, (low, high), tolerance) in QUANTITIES.items():
+        a = np.clip(func(single).astype(np.float64), low, high)
+        b = np.clip(func(double), low, high)
+        diff = np.abs(a - b)
+        worst = float(np.nanmax(diff)) if np.isfinite(diff).any() else 0.0
+        records.append({'quantity': name, 'dtype': str(func(single).dtype), 'max_abs_diff': worst, 'tolerance': tolerance, 'ok': worst <= tolerance})
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('file', help='HRRR wrfnat GRIB2 file or synthetic fixture from benchmarks.fixtures')
+    parser.add_argument('--start', type=float, nargs=2, default=(43.3,-112.88), metavar=('LAT', 'LON'))
+    parser.add_argument('--end', type=float, nargs=2, default=(46.8,-99), metavar=('LAT', 'LON'))
+    parser.add_argument('--sampling', default='nearest', choices=['nearest', 'bilinear'])
+    parser.add_argument('--vertical', default='native', choices=['native', 'pressure'])
+    parser.add_argument('--json', action='store_true', help='print JSON lines instead of a table')
+    args = parser.parse_args(argv)
+
+    records = compare(args.file, Route('precision', tuple(args.start), tuple(args.end)), args.sampling, args.vertical)
+    for record in records:
+        if args.json:
+            print(json.dumps(record))
+        elif 'float32_bytes' in record:
+            print(f"{'fields':20s} {record['float32_bytes']/2**20:8.2f} MiB float32  {record['float64_bytes']/2**20:8.2f} MiB float64")
+        else:
+            status = 'ok' if record['ok'] else 'FAIL'
+            print(f"{record['quantity']:20s} {record['dtype']:8s} max diff {record['max_abs_diff']:.2e}  (tolerance {record['tolerance']:g})  {status}")
+    return 0 if all(record.get('ok', True) for record in records) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
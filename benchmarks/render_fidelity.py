@@ -0,0 +1,55 @@
+"""
+Compare render time and PNG size of the fill fidelity modes.
+
+    python -m benchmarks.render_fidelity [--section cached.npz] [--repeat 3]
+"""
+
+import argparse
+import io
+import json
+import time
+
+import matplotlib.pyplot as plt
+
+from xsection import FIDELITIES, PRODUCTS, Section, draw_section
+
+from .synthetic import synthetic_section
+
+
+def time_render(section, product, fidelity, repeat=3, dpi=200):
+    """Best-of-``repeat`` seconds to draw and save one product, and the PNG size in bytes."""
+    best, size = float('inf'), 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fig = draw_section(section, product, (43.3,-112.88), (46.8,-99), fidelity)
+        buf = io.BytesIO()
+        fig.savefig(buf, bbox_inches='tight', dpi=dpi)
+        plt.close(fig)
+        best = min(best, time.perf_counter() - t0)
+        size = buf.tell()
+    return best, size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--section', help='section .npz (e.g. from a SectionCache) instead of synthetic data')
+    parser.add_argument('--points', type=int, default=400, help='synthetic path length')
+    parser.add_argument('--products', nargs='+', default=list(PRODUCTS), choices=list(PRODUCTS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', action='store_true', help='print JSON lines instead of a table')
+    args = parser.parse_args(argv)
+
+    section = Section.load(args.section) if args.section else synthetic_section(args.points)
+    for product in args.products:
+        baseline = None
+        for fidelity in FIDELITIES:
+            seconds, size = time_render(section, product, fidelity, args.repeat)
+            baseline = baseline or seconds
+            if args.json:
+                print(json.dumps({'product': product, 'fidelity': fidelity, 'seconds': seconds, 'bytes': size}))
+            else:
+                print(f'{product:12s} {fidelity:7s} {seconds:8.3f} s  {baseline/seconds:5.1f}x  {size/1024:8.0f} KiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Time each stage of a cross section, from file open to savefig, with memory high-water marks.
+
+    python -m benchmarks.fixtures /tmp/hrrr.synthetic.nc
+    python -m benchmarks.stages /tmp/hrrr.synthetic.nc [--repeat 3] [--json >> stages.jsonl]
+
+Startup is measured first, as the time for a fresh interpreter to import the
+package for a data-only job and for a render. Stages then run in pipeline
+order on one path: opening the file, projecting
+the path, searching grid indexes, extracting the columns, the theta-e/RH
+physics, contouring each product and saving it at dpi=200. Each reports the
+best wall and CPU time over ``--repeat`` runs and the process's peak RSS once
+the stage has run; ``--trace-memory`` adds the peak of allocations made within
+the stage (slower).
+"""
+
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import matplotlib.pyplot as plt
+
+from xsection import HRRRGrid, PRODUCTS, PathReader, Route, draw_section, relative_humidity, straight_path, theta_e
+from xsection.products import variables_for
+from xsection.profiling import peak_rss
+
+
+def measure(stage, func, repeat=1, trace=False):
+    """Run ``func`` ``repeat`` times; return its last result and a record of the best timings and memory."""
+    best_wall = best_cpu = float('inf')
+    alloc_peak = 0
+    for _ in range(repeat):
+        if trace:
+            tracemalloc.start()
+        w0, c0 = time.perf_counter(), time.process_time()
+        result = func()
+        best_wall = min(best_wall, time.perf_counter() - w0)
+        best_cpu = min(best_cpu, time.process_time() - c0)
+        if trace:
+            alloc_peak = max(alloc_peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+    record = {'stage': stage, 'seconds': best_wall, 'cpu_seconds': best_cpu, 'peak_rss': peak_rss()}
+    if trace:
+        record['alloc_peak'] = alloc_peak
+    return result, record
+
+
+#Imports of a fresh interpreter for each kind of job
+STARTUP_IMPORTS = {
+    'data': 'import xsection, xsection.cli, xsection.batch',
+    'render': 'import xsection.render',
+}
+
+
+def startup(repeat=3):
+    """Records of the best time for a fresh interpreter to import the package, per kind of job."""
+    records = []
+    for mode, statement in STARTUP_IMPORTS.items():
+        best = float('inf')
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            subprocess.run([sys.executable, '-c', statement], check=True)
+            best = min(best, time.perf_counter() - t0)
+        records.append({'stage': 'startup', 'mode': mode, 'seconds': best})
+    return records
+
+
+def run(filename, start, end, products, repeat=3, trace=False, threads=1):
+    """Records of every stage for one path through ``filename``, in pipeline order; ``threads`` is passed to PathReader."""
+    grid = HRRRGrid()
+    route = Route('bench', start, end)
+    variables = variables_for(products)
+    records = startup(repeat)
+
+    reader = PathReader(filename, threads=threads)
+    _, record = measure('open', lambda: reader.ds, 1, trace)
+    records.append(record)
+
+    _, record = measure('projection', lambda: straight_path(start, end, grid), repeat, trace)
+    records.append(record)
+
+    plan, record = measure('index', lambda: route.plan(grid), repeat, trace)
+    records.append(record)
+
+    section, record = measure('extraction', lambda: reader.extract_plan(plan, variables), repeat, trace)
+    records.append(record)
+    reader.close()
+
+    physics = lambda: (theta_e(section['t'], section['pres']), relative_humidity(section['t'], section['pres'], section['q']) if 'q' in section else None)
+    _, record = measure('physics', physics, repeat, trace)
+    records.append(record)
+
+    for product in products:
+        fig, record = measure('contour', lambda: draw_section(section, product, start, end), 1, trace)
+        records.append({**record, 'product': product})
+
+        buffer = io.BytesIO()
+        _, record = measure('savefig', lambda: fig.savefig(buffer, bbox_inches='tight', dpi=200), 1, trace)
+        records.append({**record, 'product': product})
+        plt.close(fig)
+
+    info = {'file': os.path.basename(filename), 'size': os.path.getsize(filename), 'points': plan.points, 'levels': section.levels, 'threads': threads,
+            'time': datetime.now(timezone.utc).isoformat(timespec='seconds')}
+    return [{**info, **record} for record in records]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('file', help='HRRR wrfnat GRIB2 file or synthetic fixture from benchmarks.fixtures')
+    parser.add_argument('--start', type=float, nargs=2, default=(43.3,-112.88), metavar=('LAT', 'LON'))
+    parser.add_argument('--end', type=float, nargs=2, default=(46.8,-99), metavar=('LAT', 'LON'))
+    parser.add_argument('--products', nargs='+', default=['temperature', 'rh', 'wind'], choices=list(PRODUCTS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--threads', type=int, default=1, help='decode threads of the extraction stage')
+    parser.add_argument('--trace-memory', action='store_true', help='also record the allocation peak of each stage')
+    parser.add_argument('--json', action='store_true', help='print JSON lines instead of a table')
+    args = parser.parse_args(argv)
+
+    records = run(args.file, tuple(args.start), tuple(args.end), args.products, args.repeat, args.trace_memory, args.threads)
+    for record in records:
+        if args.json:
+            print(json.dumps(record))
+        else:
+            detail = record.get('product') or record.get('mode')
+            stage = f"{record['stage']} ({detail})" if detail else record['stage']
+            if 'cpu_seconds' not in record:
+                print(f"{stage:24s} {record['seconds']:8.3f} s")
+                continue
+            alloc = f"  {record['alloc_peak']/2**20:8.1f} MiB alloc" if 'alloc_peak' in record else ''
+            print(f"{stage:24s} {record['seconds']:8.3f} s  {record['cpu_seconds']:8.3f} s cpu  {record['peak_rss']/2**20:8.1f} MiB rss{alloc}")
+
+
+if __name__ == '__main__':
+    main()
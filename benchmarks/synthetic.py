@@ -0,0 +1,56 @@
+"""
+Synthetic HRRR-shaped fixtures, so the pipeline can be measured without a real
+700 MB file from NOMADS.
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from xsection import HRRRGrid, Section, path_tangent, wind_components
+
+
+def synthetic_columns(surface_pres, levels=50, seed=0, k=None):
+    """
+    Smooth hybrid-level columns (``pres``, ``t``, ``q``, ``u``, ``v``, ``w``) over
+    the given surface pressures (Pa), shaped ``(levels,) + surface_pres.shape``.
+
+    The fields follow a standard-atmosphere lapse rate with a tropopause, a
+    moist boundary layer and an upper-level jet, so contours look realistic.
+    ``k`` picks a subset of the ``levels`` level indexes, so large grids can be
+    generated a level at a time.
+    """
+    rng = np.random.default_rng(seed)
+    ps = np.asarray(surface_pres, dtype=np.float64)
+    k = np.arange(levels) if k is None else np.atleast_1d(k)
+    k = k.astype(np.float64).reshape((-1,) + (1,)*ps.ndim)
+
+    pres = ps*np.exp(-3.9*k/(levels-1))
+    height = 7000*np.log(ps/pres)
+    phase = np.linspace(0, 4*np.pi, ps.shape[-1])
+
+    t = np.maximum(295 - 6.5e-3*height, 215) + 3*np.sin(phase)
+    q = 0.014*(pres/ps)**3*(0.6 + 0.4*np.sin(phase/2)**2)
+    jet = np.exp(-((np.log(pres) - np.log(25000))/0.35)**2)
+    u = 8 + 45*jet*(1 + 0.3*np.cos(phase))
+    v = 4*np.sin(phase) + 20*jet
+    w = 0.2*np.sin(3*phase)*np.sin(np.pi*k/(levels-1))
+
+    fields = {'pres': pres, 't': t, 'q': q, 'u': u, 'v': v, 'w': w}
+    #A little noise so contour sets aren't unrealistically simple
+    for name in ('t', 'u', 'v'):
+        fields[name] = fields[name] + 0.2*rng.standard_normal(fields[name].shape)
+    shape = (len(k),) + ps.shape
+    return {name: np.broadcast_to(data, shape).astype(np.float32) for name, data in fields.items()}
+
+
+def synthetic_section(points=400, levels=50, seed=0):
+    """A Section along a path crossing some terrain, for render benchmarks, with along/normal wind like an extraction."""
+    x = np.linspace(0, 1, points)
+    surface_pres = 101000 - 15000*np.exp(-((x - 0.35)/0.12)**2)
+    fields = synthetic_columns(surface_pres, levels, seed)
+    lat, lon = np.linspace(43.3, 46.8, points), np.linspace(-112.88, -99, points)
+    grid = HRRRGrid()
+    fields.update(wind_components(fields['u'], fields['v'], path_tangent(*grid.project(lat, lon)), grid.rotation(lon), ('along', 'normal')))
+    init = datetime(2022, 12, 24, 18)
+    return Section(fields, lat, lon, init, init + timedelta(hours=16), distance=x*1164)
@@ -0,0 +1,36 @@
+"""
+Helpers shared by the HRRR cross section scripts.
+
+Rendering and the render service load matplotlib, so their names are imported
+on first use; data-only jobs never pay for it.
+"""
+
+import importlib
+
+__version__ = '0.9.0'
+
+from .grid import HRRRGrid, HRRR_X, HRRR_Y, kw_HRRR, lcc_proj
+from .path import straight_path, spaced_path, path_indexes, Route, load_routes, PathPlan, stack_plans, save_plans, load_plans
+from .physics import mixing_ratio, potential_temperature, theta_e, relative_humidity, derive
+from .section import Section, field_dtype
+from .wind import WIND_COMPONENTS, path_tangent, wind_components
+from .vertical import PRESSURE_LEVELS, HEIGHT_LEVELS, remap_columns, remap_section
+from .reader import PathReader, open_hybrid
+from .products import Product, PRODUCTS, FIDELITIES, register_product, get_product
+from .cache import SectionCache, cache_key, file_identity
+from .subset import fetch_subset, parse_idx
+from .timeseries import TimeSection, iter_sections, time_height, time_distance
+from .locator import Locator
+from .manifest import Manifest, frame_fingerprint
+
+_LAZY = {
+    'FigureTemplate': 'render', 'get_template': 'render', 'draw_section': 'render', 'render_section': 'render',
+    'render_products': 'render', 'render_routes': 'render',
+    'SectionService': 'service', 'MemoryCache': 'service',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        return getattr(importlib.import_module(f'.{_LAZY[name]}', __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,231 @@
+"""
+Batch rendering of a whole HRRR run across a process pool.
+
+Each forecast file is one unit of work: a worker opens it once, extracts every
+route and renders every product. Results stream back as files finish, and a
+bad file is reported without stopping the rest of the run. ``run_pipeline`` is
+the single-renderer alternative that overlaps decoding with rendering.
+
+With a manifest.Manifest, both skip frames whose fingerprint is unchanged
+since the last run; a file whose frames are all unchanged isn't decoded.
+"""
+
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from functools import partial
+
+from .cache import SectionCache
+from .grid import HRRRGrid
+from .manifest import frame_fingerprint
+from .path import PathPlan
+from .pipeline import PREFETCH_DEPTH, prefetch
+from .profiling import frame
+from .products import get_product, variables_for
+from .reader import PathReader
+from .vertical import remap_section
+
+
+#hrrr.t{run hour}z.wrfnatf{frame hour}.grib2
+FILE_PATTERN = 'hrrr.t{cycle:02d}z.wrfnatf{hour:02d}.grib2'
+OUTPUT_PATTERN = '{route}.t{cycle:02d}z.f{hour:02d}.{product}.png'
+
+
+@dataclass
+class FrameResult:
+    """Outcome of rendering one forecast file."""
+
+    filename: str
+    hour: int
+    outputs: list = field(default_factory=list)
+    error: str = None
+    seconds: float = 0.0
+    #Frames left alone because their fingerprint was unchanged
+    skipped: int = 0
+    #All frames were unchanged, so the file wasn't decoded at all
+    unchanged: bool = False
+    #Fingerprints of the frames this result was asked to render, by output
+    fingerprints: dict = field(default_factory=dict, repr=False)
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def forecast_files(run_dir, cycle, hours):
+    """(hour, path) of each forecast file of a run, whether or not it exists yet."""
+    return [(hour, os.path.join(run_dir, FILE_PATTERN.format(cycle=cycle, hour=hour))) for hour in hours]
+
+
+def frame_output(out_dir, plan, cycle, hour, product):
+    """Path of the PNG of one product along one plan at one forecast hour."""
+    return os.path.join(out_dir, OUTPUT_PATTERN.format(route=plan.name, cycle=cycle, hour=hour, product=product.name))
+
+
+def changed_frames(manifest, filename, hour, cycle, plans, products, out_dir, fidelity='full', vertical='native', locator=None, force=False):
+    """
+    Outputs of one forecast file that need rendering, mapped to their fingerprints, and the number unchanged.
+
+    Without a manifest, or for a file that doesn't exist (it fails when
+    rendered instead), every frame is returned with a None fingerprint. With
+    ``force`` every frame is returned with its fingerprint, so it is rendered
+    and recorded again whatever the manifest says.
+    """
+    frames = {frame_output(out_dir, plan, cycle, hour, product): (plan, product) for plan in plans for product in products}
+    if manifest is None or not os.path.exists(filename):
+        return dict.fromkeys(frames), 0
+    changed = {}
+    for output, (plan, product) in frames.items():
+        fingerprint = frame_fingerprint(filename, plan, product, fidelity, vertical, locator)
+        if force or not manifest.unchanged(output, fingerprint):
+            changed[output] = fingerprint
+    return changed, len(frames) - len(changed)
+
+
+def record_frames(manifest, result):
+    """Record the fingerprints of a result's rendered outputs in the manifest and save it."""
+    if manifest is None or not result.outputs:
+        return
+    for output in result.outputs:
+        if result.fingerprints.get(output):
+            manifest.record(output, result.fingerprints[output])
+    manifest.save()
+
+
+def extract_file(filename, plans, variables, cache_dir=None):
+    """
+    Sections of ``variables`` along every plan for one forecast file.
+
+    All routes are extracted together from a single decode of each field.
+    With ``cache_dir`` the sections go through a SectionCache there, and the
+    file is only decoded for routes that miss.
+    """
+    cache = SectionCache(cache_dir) if cache_dir else None
+    with PathReader(filename) as reader:
+        if cache is not None:
+            return cache.fetch_many(filename, plans, variables, reader=reader)
+        return reader.extract_many(plans, variables)
+
+
+def render_sections(sections, hour, cycle, plans, products, out_dir, fidelity='full', vertical='native', locator=None, only=None):
+    """
+    Render every product for the sections of one forecast file, returning the written files.
+
+    With ``only`` (a collection of output paths) any other frame is skipped.
+    """
+    from .render import render_section
+
+    outputs = []
+    for plan, section in zip(plans, sections):
+        outs = [(product, frame_output(out_dir, plan, cycle, hour, product)) for product in products]
+        outs = [(product, output) for product, output in outs if only is None or output in only]
+        if not outs:
+            continue
+        section = remap_section(section, vertical)
+        for product, output in outs:
+            outputs.append(render_section(section, product, plan.start, plan.end, output, fidelity, locator))
+    return outputs
+
+
+def render_file(filename, hour, cycle, plans, products, out_dir, cache_dir=None, fidelity='full', vertical='native', locator=None, only=None):
+    """
+    Render every route (as PathPlans) and product for one forecast file.
+
+    ``vertical`` picks the vertical coordinate sections are remapped to before
+    drawing. With ``only`` just those outputs are rendered, though all routes
+    are still extracted (they share one decode of each field).
+
+    Never raises; failures are returned in ``FrameResult.error`` so one bad
+    file doesn't take down the batch.
+    """
+    t0 = time.perf_counter()
+    result = FrameResult(filename, hour)
+    try:
+        products = [get_product(p) for p in products]
+        with frame(file=filename, hour=hour):
+            sections = extract_file(filename, plans, variables_for(products), cache_dir)
+            result.outputs = render_sections(sections, hour, cycle, plans, products, out_dir, fidelity, vertical, locator, only)
+    except Exception:
+        result.error = traceback.format_exc()
+    result.seconds = time.perf_counter() - t0
+    return result
+
+
+def run_batch(run_dir, cycle, hours, routes, products, out_dir, workers=None, cache_dir=None, sampling='nearest', spacing=None, fidelity='full', vertical='native', locator=None, manifest=None, force=False):
+    """
+    Render a run's forecast hours in parallel, yielding FrameResults as they finish.
+
+    ``routes`` may be Routes or prebuilt PathPlans; routes are planned once
+    here rather than in every worker, with ``sampling``/``spacing``.
+    ``workers`` defaults to the number of cores. With a ``manifest`` only
+    changed frames are rendered (all of them with ``force``), files with none
+    are yielded first without being decoded, and the manifest is saved as
+    each file finishes.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    grid = HRRRGrid()
+    plans = [r if isinstance(r, PathPlan) else r.plan(grid, sampling=sampling, spacing=spacing) for r in routes]
+    products = [get_product(p) for p in products]
+    work = []
+    for hour, filename in forecast_files(run_dir, cycle, hours):
+        changed, skipped = changed_frames(manifest, filename, hour, cycle, plans, products, out_dir, fidelity, vertical, locator, force)
+        if changed:
+            work.append((hour, filename, changed, skipped))
+        else:
+            yield FrameResult(filename, hour, skipped=skipped, unchanged=True)
+    if not work:
+        return
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        #Products go by name; their colormap factories don't pickle
+        names = [product.name for product in products]
+        futures = {pool.submit(render_file, filename, hour, cycle, plans, names, out_dir, cache_dir, fidelity, vertical, locator, set(changed)): (changed, skipped)
+                   for hour, filename, changed, skipped in work}
+        for future in as_completed(futures):
+            result = future.result()
+            result.fingerprints, result.skipped = futures[future]
+            record_frames(manifest, result)
+            yield result
+
+
+def run_pipeline(run_dir, cycle, hours, routes, products, out_dir, depth=PREFETCH_DEPTH, cache_dir=None, sampling='nearest', spacing=None, fidelity='full', vertical='native', locator=None, manifest=None, force=False):
+    """
+    Render a run's forecast hours in order, decoding ahead in a background process.
+
+    While this process renders hour N, up to ``depth`` following hours are
+    read and extracted by a single loader process, so the GRIB decode hides
+    behind matplotlib instead of alternating with it. Yields FrameResults in
+    hour order; ``seconds`` counts only the time the frame held up the
+    renderer. With a ``manifest`` only changed frames are rendered (all of
+    them with ``force``), and files with none are yielded first without being
+    decoded.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    grid = HRRRGrid()
+    plans = [r if isinstance(r, PathPlan) else r.plan(grid, sampling=sampling, spacing=spacing) for r in routes]
+    products = [get_product(p) for p in products]
+    load = partial(extract_file, plans=plans, variables=variables_for(products), cache_dir=cache_dir)
+    files, frames = {}, {}
+    for hour, filename in forecast_files(run_dir, cycle, hours):
+        changed, skipped = changed_frames(manifest, filename, hour, cycle, plans, products, out_dir, fidelity, vertical, locator, force)
+        if changed:
+            files[filename], frames[filename] = hour, (changed, skipped)
+        else:
+            yield FrameResult(filename, hour, skipped=skipped, unchanged=True)
+
+    t0 = time.perf_counter()
+    for filename, sections, error in prefetch(files, load, depth):
+        changed, skipped = frames[filename]
+        result = FrameResult(filename, files[filename], skipped=skipped, fingerprints=changed)
+        try:
+            if error is not None:
+                raise error
+            with frame(file=filename, hour=result.hour):
+                result.outputs = render_sections(sections, result.hour, cycle, plans, products, out_dir, fidelity, vertical, locator, set(changed))
+        except Exception:
+            result.error = traceback.format_exc()
+        result.seconds = time.perf_counter() - t0
+        record_frames(manifest, result)
+        yield result
+        t0 = time.perf_counter()
@@ -0,0 +1,140 @@
+"""
+Persistent on-disk cache of extracted cross section columns.
+
+Sections are stored as uncompressed ``.npz`` files keyed by the identity of
+the source file (path, size, mtime), the path definition, the sampling
+settings and the field dtype, so re-rendering a section (a new colormap, a new title) skips the
+GRIB decode entirely. The directory is kept under a size limit by evicting
+the least recently used entries.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from .reader import PathReader
+from .section import Section, field_dtype
+
+
+#Default size limit of a cache directory (bytes)
+MAX_CACHE_BYTES = 2*2**30
+
+#Age after which a leftover ``.tmp`` file of an interrupted ``put`` is deleted (s)
+STALE_TMP_SECONDS = 3600
+
+
+def file_identity(filename):
+    """(absolute path, size, mtime) of a file; changes whenever the file is replaced."""
+    st = os.stat(filename)
+    return (os.path.abspath(filename), st.st_size, st.st_mtime_ns)
+
+
+def cache_key(filename, path):
+    """
+    Cache key of a section.
+
+    ``path`` is a JSON-serializable description of the path and its sampling
+    settings, normally ``PathPlan.describe()``.
+    """
+    blob = json.dumps([file_identity(filename), path, field_dtype().name], sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()[:32]
+
+
+class SectionCache:
+    """LRU, size-bounded directory of cached sections."""
+
+    def __init__(self, directory, max_bytes=MAX_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.npz')
+
+    def get(self, key):
+        """Cached section for ``key``, or None."""
+        path = self._path(key)
+        try:
+            section = Section.load(path)
+        except (OSError, ValueError, KeyError):
+            return None
+        #Mark as recently used; another process may have evicted it meanwhile
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return section
+
+    def put(self, key, section):
+        """Store a section and evict old entries if over the size limit."""
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                section.save(f)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            os.remove(tmp)
+            raise
+        self.evict()
+
+    def evict(self):
+        """
+        Delete least recently used entries until the cache fits in ``max_bytes``.
+
+        Workers share the directory, so entries that vanish while scanning are
+        skipped. Temporary files left by interrupted puts are removed once stale.
+        """
+        entries = []
+        now = time.time()
+        for entry in os.scandir(self.directory):
+            try:
+                st = entry.stat()
+                if entry.name.endswith('.tmp') and now - st.st_mtime > STALE_TMP_SECONDS:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            if entry.name.endswith('.npz'):
+                entries.append((st.st_mtime, st.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def fetch(self, filename, plan, variables, reader=None):
+        """Section of ``variables`` along a PathPlan, from the cache when possible."""
+        return self.fetch_many(filename, [plan], variables, reader)[0]
+
+    def fetch_many(self, filename, plans, variables, reader=None):
+        """
+        Sections of ``variables`` along several PathPlans, from the cache when possible.
+
+        Plans that miss (or whose cached entry lacks some variables) are
+        extracted together in one pass with ``reader``, or a new PathReader on
+        ``filename``, and stored.
+        """
+        keys = [cache_key(filename, plan.describe()) for plan in plans]
+        sections = [self.get(key) for key in keys]
+        missing = [i for i, section in enumerate(sections) if section is None or not all(v in section for v in variables)]
+        if not missing:
+            return sections
+
+        wanted = list(variables)
+        for i in missing:
+            if sections[i] is not None:
+                wanted += [v for v in sections[i].fields if v not in wanted]
+        if reader is None:
+            with PathReader(filename) as reader:
+                extracted = reader.extract_many([plans[i] for i in missing], wanted)
+        else:
+            extracted = reader.extract_many([plans[i] for i in missing], wanted)
+        for i, section in zip(missing, extracted):
+            self.put(keys[i], section)
+            sections[i] = section
+        return sections
@@ -0,0 +1,241 @@
+"""
+Command line entry point, ``python -m xsection``.
+"""
+
+import argparse
+import os
+import sys
+
+from .path import SAMPLINGS, Route, load_routes, load_plans, save_plans
+from .products import FIDELITIES, PRODUCTS
+
+
+def coords(text):
+    """Parse 'lat,lon' into a tuple of floats."""
+    lat, lon = (float(v) for v in text.split(','))
+    return (lat, lon)
+
+
+def hours(text):
+    """Parse forecast hours, e.g. '0-18' or '1,2,6-9'."""
+    out = []
+    for part in text.split(','):
+        first, _, last = part.partition('-')
+        out += range(int(first), int(last or first)+1)
+    return out
+
+
+def route(text):
+    """Parse 'name=lat,lon:lat,lon' (more ':lat,lon' for a polyline) into a Route."""
+    name, _, points = text.partition('=')
+    points = [coords(p) for p in points.split(':')]
+    return Route(name, points[0], points[-1], tuple(points[1:-1]))
+
+
+def add_sampling_arguments(parser):
+    parser.add_argument('--sampling', default='nearest', choices=SAMPLINGS, help='nearest grid point or bilinear interpolation')
+    parser.add_argument('--spacing', type=float, default=None, help='sample spacing along the path (m)')
+
+
+def add_threads_argument(parser):
+    parser.add_argument('--threads', type=int, default=1, help='threads decoding GRIB messages in parallel, for single-frame latency on multi-core machines')
+
+
+def add_profile_arguments(parser):
+    parser.add_argument('--profile', metavar='JSONL', help='append per-frame stage timings to this JSON lines file')
+    parser.add_argument('--cprofile', metavar='DIR', help='with --profile, also dump a cProfile of each frame into DIR')
+
+
+def add_dtype_argument(parser):
+    parser.add_argument('--float64', action='store_true', help='extract and derive fields in float64 instead of float32, for validation')
+
+
+def add_locator_arguments(parser):
+    parser.add_argument('--states', metavar='SHP', help='state boundaries shapefile for a locator map inset')
+    parser.add_argument('--counties', metavar='SHP', help='county boundaries shapefile for the locator map inset')
+
+
+def locator(args):
+    """Locator of the --states/--counties arguments, or None."""
+    if not (args.states or args.counties):
+        return None
+    from .locator import Locator
+    return Locator(args.states, args.counties)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='xsection', description='HRRR cross sections along a custom path.')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    render = sub.add_parser('render', help='Render products for one or more paths from a single forecast file.')
+    render.add_argument('file', help='hrrr.t{HH}z.wrfnatf{FF}.grib2 file')
+    render.add_argument('--start', type=coords, help='start coordinates, lat,lon')
+    render.add_argument('--end', type=coords, help='end coordinates, lat,lon')
+    render.add_argument('--route', type=route, action='append', default=[], help="named path, 'name=lat,lon:lat,lon' (repeatable)")
+    render.add_argument('--routes', help='JSON file of named routes')
+    render.add_argument('--products', nargs='+', default=list(PRODUCTS), choices=list(PRODUCTS))
+    render.add_argument('--output', default=None, help='output file pattern, formatted with {product} (and {route} for named routes)')
+    render.add_argument('--cache-dir', help='reuse extracted sections cached in this directory')
+    add_sampling_arguments(render)
+    render.add_argument('--fidelity', default='full', choices=FIDELITIES, help='fill rendering mode; fast and raster are several times quicker than full')
+    render.add_argument('--vertical', default='native', choices=['native', 'pressure'], help='draw on native hybrid levels or remap to fixed pressure levels')
+    add_locator_arguments(render)
+    add_threads_argument(render)
+    add_dtype_argument(render)
+    add_profile_arguments(render)
+
+    batch = sub.add_parser('batch', help='Render every forecast hour of a run across a process pool.')
+    batch.add_argument('run_dir', help='directory holding the hrrr.t{HH}z.wrfnatf{FF}.grib2 files')
+    batch.add_argument('--cycle', type=int, required=True, help='run hour, e.g. 18')
+    batch.add_argument('--hours', type=hours, required=True, help="forecast hours, e.g. '0-18' or '1,2,6-9'")
+    batch.add_argument('--route', type=route, action='append', default=[], help="named path, 'name=lat,lon:lat,lon' (repeatable)")
+    batch.add_argument('--routes', help='JSON file of named routes')
+    batch.add_argument('--plans', help='path plans file written by the plan command')
+    batch.add_argument('--products', nargs='+', default=list(PRODUCTS), choices=list(PRODUCTS))
+    batch.add_argument('--out-dir', default='.', help='directory for the rendered PNGs')
+    batch.add_argument('--workers', type=int, default=None, help='worker processes (default: number of cores)')
+    batch.add_argument('--prefetch', type=int, default=0, metavar='DEPTH', help='render in this process, decoding up to DEPTH hours ahead in a background process')
+    batch.add_argument('--cache-dir', help='reuse extracted sections cached in this directory')
+    batch.add_argument('--force', action='store_true', help="re-render this run's frames even if unchanged since the last run (other manifest entries are kept)")
+    add_sampling_arguments(batch)
+    batch.add_argument('--fidelity', default='full', choices=FIDELITIES, help='fill rendering mode; fast and raster are several times quicker than full')
+    batch.add_argument('--vertical', default='native', choices=['native', 'pressure'], help='draw on native hybrid levels or remap to fixed pressure levels')
+    add_locator_arguments(batch)
+    add_dtype_argument(batch)
+    add_profile_arguments(batch)
+
+    fetch = sub.add_parser('fetch', help='Download only the messages the products need, using the .idx inventories.')
+    fetch.add_argument('sources', nargs='+', help='GRIB2 URLs or local paths, each with a .idx inventory next to it')
+    fetch.add_argument('--out-dir', default='.', help='directory for the slim GRIB2 files')
+    fetch.add_argument('--products', nargs='+', default=list(PRODUCTS), choices=list(PRODUCTS))
+    fetch.add_argument('--variables', nargs='+', help='extra cfgrib variables to keep, e.g. w gh')
+
+    th = sub.add_parser('time-height', help='Stream a column at one point over the forecast hours of a run.')
+    th.add_argument('run_dir', help='directory holding the hrrr.t{HH}z.wrfnatf{FF}.grib2 files')
+    th.add_argument('--cycle', type=int, required=True, help='run hour, e.g. 18')
+    th.add_argument('--hours', type=hours, required=True, help="forecast hours, e.g. '0-18'")
+    th.add_argument('--point', type=coords, required=True, help='lat,lon')
+    th.add_argument('--variables', nargs='+', default=['t'], help='raw or derived variables, e.g. t theta_e rh')
+    th.add_argument('--output', default='./time-height.npz')
+    add_dtype_argument(th)
+
+    td = sub.add_parser('time-distance', help='Stream one level along a path over the forecast hours of a run.')
+    td.add_argument('run_dir', help='directory holding the hrrr.t{HH}z.wrfnatf{FF}.grib2 files')
+    td.add_argument('--cycle', type=int, required=True, help='run hour, e.g. 18')
+    td.add_argument('--hours', type=hours, required=True, help="forecast hours, e.g. '0-18'")
+    td.add_argument('--route', type=route, required=True, help="path, 'name=lat,lon:lat,lon'")
+    td.add_argument('--level', type=int, required=True, help='hybrid level index')
+    td.add_argument('--variables', nargs='+', default=['t'], help='raw or derived variables, e.g. t theta_e rh')
+    td.add_argument('--output', default='./time-distance.npz')
+    add_sampling_arguments(td)
+    add_dtype_argument(td)
+
+    serve = sub.add_parser('serve', help='Serve sections and rendered products over local HTTP, keeping a run warm in memory.')
+    serve.add_argument('run_dir', help='directory holding the hrrr.t{HH}z.wrfnatf{FF}.grib2 files')
+    serve.add_argument('--cycle', type=int, required=True, help='run hour, e.g. 18')
+    serve.add_argument('--preload', type=hours, default=[], help="forecast hours to decode at startup, e.g. '16-17' (about 1.8 GiB per hour for all products; hours past --memory are skipped with a warning)")
+    serve.add_argument('--products', nargs='+', default=list(PRODUCTS), choices=list(PRODUCTS), help='products whose fields are preloaded')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--memory', type=float, default=4096, help='memory budget for decoded fields (MiB)')
+    add_threads_argument(serve)
+    add_dtype_argument(serve)
+
+    plan = sub.add_parser('plan', help='Precompute path plans for named routes and save them to disk.')
+    plan.add_argument('routes', help='JSON file of named routes')
+    plan.add_argument('--output', default='plans.npz', help='plans file to write')
+    plan.add_argument('--step', type=float, default=3000, help='per-axis step of the original nearest-point paths (m)')
+    add_sampling_arguments(plan)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if getattr(args, 'profile', None):
+        from .profiling import enable
+        enable(args.profile, args.cprofile)
+    if getattr(args, 'float64', False):
+        from .section import FLOAT64_ENV
+        os.environ[FLOAT64_ENV] = '1'
+
+    if args.command == 'render':
+        from .cache import SectionCache
+        from .render import render_routes
+        cache = SectionCache(args.cache_dir) if args.cache_dir else None
+        routes = args.route + (load_routes(args.routes) if args.routes else [])
+        if args.start and args.end:
+            routes.insert(0, Route('', args.start, args.end))
+        if not routes:
+            build_parser().error('render needs --start and --end, or named routes')
+        output = args.output or ('./{product}.png' if len(routes) == 1 and not routes[0].name else './{route}.{product}.png')
+        for filename in render_routes(args.file, routes, args.products, output, cache=cache, sampling=args.sampling, spacing=args.spacing, fidelity=args.fidelity, vertical=args.vertical, locator=locator(args), threads=args.threads):
+            print(filename)
+        return 0
+
+    if args.command == 'batch':
+        from .batch import run_batch, run_pipeline
+        from .manifest import MANIFEST_NAME, Manifest
+        routes = args.route + (load_routes(args.routes) if args.routes else [])
+        routes += list(load_plans(args.plans).values()) if args.plans else []
+        if not routes:
+            build_parser().error('batch needs at least one --route, --routes or --plans file')
+        manifest = Manifest(os.path.join(args.out_dir, MANIFEST_NAME))
+        failed = rendered_files = unchanged_files = rendered = skipped = 0
+        if args.prefetch:
+            results = run_pipeline(args.run_dir, args.cycle, args.hours, routes, args.products, args.out_dir, args.prefetch, args.cache_dir, args.sampling, args.spacing, args.fidelity, args.vertical, locator(args), manifest, args.force)
+        else:
+            results = run_batch(args.run_dir, args.cycle, args.hours, routes, args.products, args.out_dir, args.workers, args.cache_dir, args.sampling, args.spacing, args.fidelity, args.vertical, locator(args), manifest, args.force)
+        for result in results:
+            for filename in result.outputs:
+                print(filename, flush=True)
+            rendered += len(result.outputs)
+            skipped += result.skipped
+            if not result.ok:
+                failed += 1
+                print(f'FAILED {result.filename}\n{result.error}', file=sys.stderr, flush=True)
+            elif result.unchanged:
+                unchanged_files += 1
+            else:
+                rendered_files += 1
+        files, frames = len(args.hours), rendered + skipped
+        print(f'{files} files: {rendered_files} rendered, {unchanged_files} unchanged and skipped without decoding ({unchanged_files/files:.0%}), {failed} failed', file=sys.stderr)
+        if frames:
+            print(f'{frames} frames: {rendered} rendered, {skipped} unchanged ({skipped/frames:.0%} hit rate)', file=sys.stderr)
+        return 1 if failed else 0
+
+    if args.command == 'fetch':
+        from .products import variables_for
+        from .subset import fetch_subset, subset_name
+        variables = variables_for(args.products) + [v for v in args.variables or [] if v not in variables_for(args.products)]
+        os.makedirs(args.out_dir, exist_ok=True)
+        for source in args.sources:
+            dest = subset_name(source, args.out_dir)
+            size = fetch_subset(source, dest, variables)
+            print(f'{dest} ({size/2**20:.1f} MiB)')
+        return 0
+
+    if args.command in ('time-height', 'time-distance'):
+        from .batch import forecast_files
+        from .timeseries import time_distance, time_height
+        files = [filename for _, filename in forecast_files(args.run_dir, args.cycle, args.hours)]
+        if args.command == 'time-height':
+            result = time_height(files, *args.point, args.variables)
+        else:
+            result = time_distance(files, args.route.plan(sampling=args.sampling, spacing=args.spacing), args.variables, args.level)
+        result.save(args.output)
+        print(args.output)
+        return 0
+
+    if args.command == 'serve':
+        from .service import SectionService, serve
+        service = SectionService(args.run_dir, args.cycle, int(args.memory*2**20), threads=args.threads)
+        service.preload(args.preload, args.products)
+        print(f'Serving {args.run_dir} t{args.cycle:02d}z on http://{args.host}:{args.port}', file=sys.stderr, flush=True)
+        serve(service, args.host, args.port)
+        return 0
+
+    if args.command == 'plan':
+        plans = [route.plan(step=args.step, sampling=args.sampling, spacing=args.spacing) for route in load_routes(args.routes)]
+        save_plans(args.output, plans)
+        print(f'{len(plans)} plans written to {args.output}')
+        return 0
@@ -0,0 +1,122 @@
+"""
+HRRR grid definition and closed-form coordinate -> index mapping.
+
+The HRRR native grid is regular in its Lambert Conformal projection, so the
+index of a projected coordinate can be computed directly instead of scanning
+every grid point for the closest one.
+"""
+
+import numpy as np
+from pyproj import Transformer
+
+
+#HRRR grid, projected coordinates of the grid points (m)
+HRRR_X = np.arange(-2700573.2500000000000000,2696426.7500000000000000,3000)
+HRRR_Y = np.arange(-1590306.1250000000000000,1586693.8750000000000000,3000)
+
+#HRRR crs; the Relative Humidity and Wind scripts named the same values kw_NAM
+kw_HRRR = dict(central_longitude=262.5, central_latitude=38.5, false_easting=0.0, false_northing=0.0, standard_parallels=(38.5,38.5))
+
+#Geographic coordinates the paths are given in (cartopy's PlateCarree default globe)
+LONLAT_PROJ = '+proj=longlat +ellps=WGS84 +no_defs'
+
+
+def lcc_proj(crs_kw):
+    """PROJ string of a Lambert Conformal crs given cartopy-style keywords (``kw_HRRR``), on cartopy's default WGS84 globe."""
+    lat_1, lat_2 = crs_kw.get('standard_parallels', (33, 45))
+    return (f"+proj=lcc +lat_0={crs_kw.get('central_latitude', 39.0)} +lon_0={crs_kw.get('central_longitude', -96.0)} "
+            f"+lat_1={lat_1} +lat_2={lat_2} +x_0={crs_kw.get('false_easting', 0.0)} +y_0={crs_kw.get('false_northing', 0.0)} +ellps=WGS84 +units=m +no_defs")
+
+
+class HRRRGrid:
+    """
+    Map lat/lon and projected coordinates onto indexes of a 1D-separable grid.
+
+    ``x`` and ``y`` are the projected coordinates of the grid columns and rows.
+    When they are evenly spaced (the HRRR's 3 km grid) indexes are computed in
+    closed form; otherwise a ``searchsorted`` lookup is used.
+    """
+
+    def __init__(self, x=HRRR_X, y=HRRR_Y, crs_kw=kw_HRRR):
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.crs_kw = dict(crs_kw)
+        self._x_step = _regular_step(self.x)
+        self._y_step = _regular_step(self.y)
+        self._transformer = None
+
+    @property
+    def shape(self):
+        """(ny, nx), matching the trailing dimensions of the data fields."""
+        return (len(self.y), len(self.x))
+
+    @property
+    def transformer(self):
+        """lon/lat -> projected coordinates, built on first use."""
+        if self._transformer is None:
+            self._transformer = Transformer.from_crs(LONLAT_PROJ, lcc_proj(self.crs_kw), always_xy=True)
+        return self._transformer
+
+    def project(self, lat, lon):
+        """Convert lat/lon (scalars or arrays) to projected x, y in one call."""
+        px, py = self.transformer.transform(np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64))
+        return np.asarray(px), np.asarray(py)
+
+    def unproject(self, px, py):
+        """Convert projected x, y back to lat, lon."""
+        lon, lat = self.transformer.transform(np.asarray(px, dtype=np.float64), np.asarray(py, dtype=np.float64), direction='INVERSE')
+        return np.asarray(lat), np.asarray(lon)
+
+    @property
+    def cone(self):
+        """Cone constant of the Lambert Conformal projection."""
+        lat1, lat2 = np.radians(self.crs_kw['standard_parallels'])
+        if np.isclose(lat1, lat2):
+            return float(np.sin(lat1))
+        return float(np.log(np.cos(lat1)/np.cos(lat2))/np.log(np.tan(np.pi/4 + lat2/2)/np.tan(np.pi/4 + lat1/2)))
+
+    def rotation(self, lon):
+        """Angle (radians) from true north to grid north at longitudes ``lon``."""
+        dlon = (np.asarray(lon, dtype=np.float64) - self.crs_kw['central_longitude'] + 180) % 360 - 180
+        return self.cone*np.radians(dlon)
+
+    def fractional_index(self, px, py):
+        """Fractional (row, column) position of projected coordinates."""
+        return (_fractional(self.y, self._y_step, py), _fractional(self.x, self._x_step, px))
+
+    def nearest_index(self, px, py):
+        """Nearest (row, column) grid index of projected coordinates, clipped to the grid."""
+        fy, fx = self.fractional_index(px, py)
+        iy = np.clip(np.rint(fy), 0, len(self.y)-1).astype(np.intp)
+        ix = np.clip(np.rint(fx), 0, len(self.x)-1).astype(np.intp)
+        return iy, ix
+
+    def latlon_to_index(self, lat, lon):
+        """Nearest (row, column) grid index for whole arrays of lat/lon."""
+        return self.nearest_index(*self.project(lat, lon))
+
+    def contains(self, px, py):
+        """True where projected coordinates fall within the grid."""
+        px, py = np.asarray(px), np.asarray(py)
+        return (px >= self.x[0]) & (px <= self.x[-1]) & (py >= self.y[0]) & (py <= self.y[-1])
+
+
+def _regular_step(coords):
+    #Return the spacing of evenly spaced coordinates, or None
+    if len(coords) < 2:
+        return None
+    steps = np.diff(coords)
+    if np.allclose(steps, steps[0], rtol=0, atol=1e-6*abs(steps[0])):
+        return float(steps[0])
+    return None
+
+
+def _fractional(coords, step, values):
+    values = np.asarray(values, dtype=np.float64)
+    if step is not None:
+        return (values - coords[0])/step
+    #Irregular spacing: locate the bracketing points and interpolate between them
+    if coords[0] > coords[-1]:
+        return (len(coords)-1) - _fractional(coords[::-1], None, values)
+    i = np.clip(np.searchsorted(coords, values) - 1, 0, len(coords)-2)
+    return i + (values - coords[i])/(coords[i+1] - coords[i])
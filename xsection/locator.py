@@ -0,0 +1,192 @@
+"""
+Locator map inset drawn in the upper right of a cross section.
+
+Boundary shapefiles (states, counties) are read once, projected into the HRRR
+crs, simplified and cached to disk as compact ``.npz`` arrays, so later runs
+load them in milliseconds. Each frame only queries an STRtree for the lines
+near the path, clips them to the inset's extent and swaps them into a
+LineCollection on a plain axes; there is no cartopy GeoAxes involved.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from .cache import file_identity
+from .grid import HRRRGrid
+
+
+#Simplification tolerance of boundary lines (m), well under a pixel of the inset
+BOUNDARY_TOLERANCE = 500
+
+#Default directory of cached boundary arrays
+BOUNDARY_CACHE = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')), 'xsection', 'boundaries')
+
+#Inset position within the section axes (x, y, width, height, in axes fractions)
+INSET_BOUNDS = (0.74, 0.64, 0.255, 0.35)
+
+COUNTY_STYLE = dict(colors='#8a8a8a', linewidths=0.3, linestyles=':')
+STATE_STYLE = dict(colors='#2e2e2e', linewidths=0.6)
+
+#Boundaries loaded by this process, keyed by their disk cache path
+_loaded = {}
+
+
+def read_shapefile_lines(filename, grid):
+    """Every part of every shape in a lat/lon shapefile as projected ``(coords, offsets)``."""
+    import shapefile
+
+    points, offsets = [], [0]
+    with shapefile.Reader(filename) as sf:
+        for shape in sf.iterShapes():
+            if not shape.points:
+                continue
+            starts = list(shape.parts) + [len(shape.points)]
+            part_points = np.asarray(shape.points, dtype=np.float64)
+            for a, b in zip(starts[:-1], starts[1:]):
+                if b - a >= 2:
+                    points.append(part_points[a:b])
+                    offsets.append(offsets[-1] + b - a)
+    lonlat = np.concatenate(points) if points else np.empty((0, 2))
+    px, py = grid.project(lonlat[:, 1], lonlat[:, 0])
+    return np.stack([px, py], axis=-1), np.asarray(offsets, dtype=np.int64)
+
+
+class Boundaries:
+    """Projected boundary lines of one shapefile, with a spatial index for clipping."""
+
+    def __init__(self, coords, offsets):
+        import shapely
+
+        self.coords = coords
+        self.offsets = offsets
+        ids = np.repeat(np.arange(len(offsets)-1), np.diff(offsets))
+        self.lines = shapely.linestrings(coords, indices=ids) if len(coords) else np.empty(0, dtype=object)
+        self.tree = shapely.STRtree(self.lines)
+        self.clip = functools.lru_cache(maxsize=64)(self._clip)
+
+    @classmethod
+    def load(cls, filename, grid=None, tolerance=BOUNDARY_TOLERANCE, cache_dir=BOUNDARY_CACHE):
+        """
+        Boundaries of a shapefile, from the disk cache when possible.
+
+        The cache entry is keyed by the shapefile's identity, the tolerance and
+        the grid's crs, and holds float32 coordinates plus line offsets. Loaded
+        boundaries are also kept for the life of the process, so pool workers
+        that unpickle a Locator per task reuse them.
+        """
+        grid = grid or HRRRGrid()
+        blob = json.dumps([file_identity(filename), tolerance, grid.crs_kw], sort_keys=True, default=str)
+        path = os.path.join(cache_dir, hashlib.sha256(blob.encode()).hexdigest()[:32] + '.npz')
+        if path in _loaded:
+            return _loaded[path]
+        try:
+            with np.load(path) as npz:
+                _loaded[path] = cls(npz['coords'].astype(np.float64), npz['offsets'])
+                return _loaded[path]
+        except (OSError, KeyError, ValueError):
+            pass
+
+        import shapely
+
+        coords, offsets = read_shapefile_lines(filename, grid)
+        boundaries = cls(coords, offsets)
+        if tolerance:
+            simplified = shapely.simplify(boundaries.lines, tolerance)
+            coords, index = shapely.get_coordinates(simplified, return_index=True)
+            offsets = np.concatenate([[0], np.cumsum(np.bincount(index, minlength=len(simplified)))])
+            boundaries = cls(coords, offsets)
+
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, coords=coords.astype(np.float32), offsets=offsets)
+        os.replace(tmp, path)
+        _loaded[path] = boundaries
+        return boundaries
+
+    def _clip(self, bbox):
+        #Line segments (list of (n, 2) arrays) within bbox (x0, y0, x1, y1)
+        import shapely
+
+        hits = self.tree.query(shapely.box(*bbox))
+        if not len(hits):
+            return []
+        parts = shapely.get_parts(shapely.clip_by_rect(self.lines[hits], *bbox))
+        coords, index = shapely.get_coordinates(parts, return_index=True)
+        return [line for line in np.split(coords, np.flatnonzero(np.diff(index)) + 1) if len(line) >= 2]
+
+
+class Locator:
+    """
+    Settings and geometry of the locator inset.
+
+    ``states`` and ``counties`` are shapefile paths (either may be None). The
+    locator pickles as its settings, so process-pool workers reload the
+    cached boundaries rather than receiving them.
+    """
+
+    def __init__(self, states=None, counties=None, tolerance=BOUNDARY_TOLERANCE, cache_dir=BOUNDARY_CACHE, grid=None):
+        self.states = states
+        self.counties = counties
+        self.tolerance = tolerance
+        self.cache_dir = cache_dir
+        self.grid = grid or HRRRGrid()
+        self.layers = [(Boundaries.load(path, self.grid, tolerance, cache_dir), style)
+                       for path, style in ((counties, COUNTY_STYLE), (states, STATE_STYLE)) if path]
+
+    def __reduce__(self):
+        return (Locator, (self.states, self.counties, self.tolerance, self.cache_dir, self.grid))
+
+    def describe(self):
+        """JSON-serializable description of the inset's inputs, used in fingerprints."""
+        return {'states': self.states and file_identity(self.states), 'counties': self.counties and file_identity(self.counties),
+                'tolerance': self.tolerance, 'crs': self.grid.crs_kw}
+
+    def extent(self, px, py, aspect):
+        """Projected bbox around a path with some margin, ``aspect`` (height/width) shaped and snapped to 1 km."""
+        x0, x1, y0, y1 = px.min(), px.max(), py.min(), py.max()
+        pad = max(0.15*max(x1-x0, y1-y0), 50000)
+        x0, x1, y0, y1 = x0-pad, x1+pad, y0-pad, y1+pad
+        cx, cy, w, h = (x0+x1)/2, (y0+y1)/2, x1-x0, y1-y0
+        w, h = max(w, h/aspect), max(h, w*aspect)
+        return tuple(float(np.round(v, -3)) for v in (cx-w/2, cy-h/2, cx+w/2, cy+h/2))
+
+    def attach(self, ax):
+        """Add the inset to a section axes and return it."""
+        return LocatorInset(self, ax)
+
+
+class LocatorInset:
+    """The inset axes of one figure; ``update`` redraws it for a new section."""
+
+    def __init__(self, locator, ax):
+        from matplotlib.collections import LineCollection
+
+        self.locator = locator
+        self.ax = ax.inset_axes(INSET_BOUNDS, zorder=5)
+        self.ax.set_facecolor('white')
+        self.ax.set_xticks([])
+        self.ax.set_yticks([])
+        self.collections = [self.ax.add_collection(LineCollection([], **style)) for _, style in locator.layers]
+        self.path, = self.ax.plot([], [], color='red', linewidth=2, zorder=10)
+        self.ends, = self.ax.plot([], [], 'o', color='red', markersize=4, zorder=10)
+
+        fig_w, fig_h = ax.figure.get_size_inches()
+        pos = ax.get_position()
+        self.aspect = (INSET_BOUNDS[3]*pos.height*fig_h)/(INSET_BOUNDS[2]*pos.width*fig_w)
+
+    def update(self, section):
+        """Show the path of ``section`` and the boundaries around it."""
+        px, py = self.locator.grid.project(section.lat, section.lon)
+        bbox = self.locator.extent(px, py, self.aspect)
+        for collection, (boundaries, _) in zip(self.collections, self.locator.layers):
+            collection.set_segments(boundaries.clip(bbox))
+        self.path.set_data(px, py)
+        self.ends.set_data(px[[0, -1]], py[[0, -1]])
+        self.ax.set_xlim(bbox[0], bbox[2])
+        self.ax.set_ylim(bbox[1], bbox[3])
@@ -0,0 +1,74 @@
+"""
+Fingerprints of rendered frames, so reruns of a batch skip frames whose inputs haven't changed.
+
+A frame's fingerprint hashes everything its PNG depends on: the identity of
+the source file (path, size, mtime), the path plan, the product's settings
+(bins, colormap, range, draw function), the render options and the code
+version. The manifest, a JSON file next to the outputs, maps each output to
+the fingerprint it was rendered with.
+"""
+
+import functools
+import glob
+import hashlib
+import json
+import os
+import tempfile
+
+from .cache import file_identity
+from .section import field_dtype
+
+
+#Name of the manifest file within an output directory
+MANIFEST_NAME = 'manifest.json'
+
+
+@functools.lru_cache(maxsize=None)
+def code_version():
+    """Package version plus a hash of the package's source, so local edits also change fingerprints."""
+    from . import __version__
+
+    h = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(__file__), '*.py'))):
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    return f'{__version__}+{h.hexdigest()[:12]}'
+
+
+def frame_fingerprint(filename, plan, product, fidelity='full', vertical='native', locator=None):
+    """Fingerprint of one rendered frame: ``product`` (a Product) along a PathPlan through ``filename``."""
+    blob = json.dumps({'file': file_identity(filename), 'path': plan.describe(), 'product': product.describe(), 'fidelity': fidelity,
+                       'vertical': vertical, 'locator': locator.describe() if locator is not None else None,
+                       'dtype': field_dtype().name, 'code': code_version()}, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()[:32]
+
+
+class Manifest:
+    """Output file -> fingerprint of the frames rendered into a directory."""
+
+    def __init__(self, path):
+        self.path = path
+        self.directory = os.path.dirname(os.path.abspath(path))
+        try:
+            with open(path) as f:
+                self.frames = json.load(f)['frames']
+        except (OSError, ValueError, KeyError):
+            self.frames = {}
+
+    def _key(self, output):
+        return os.path.relpath(os.path.abspath(output), self.directory)
+
+    def unchanged(self, output, fingerprint):
+        """Whether ``output`` exists and was rendered with ``fingerprint``."""
+        return self.frames.get(self._key(output)) == fingerprint and os.path.exists(output)
+
+    def record(self, output, fingerprint):
+        self.frames[self._key(output)] = fingerprint
+
+    def save(self):
+        """Write the manifest atomically, so an interrupted run leaves the previous one intact."""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'frames': self.frames}, f, indent=0, sort_keys=True)
+        os.replace(tmp, self.path)
@@ -0,0 +1,318 @@
+"""
+Cross section path construction in the HRRR's projected CRS.
+
+Paths are straight *in the projected crs*, so they appear slightly curved on a
+mercator map.
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass
+
+import numpy as np
+
+from .grid import HRRRGrid
+from .profiling import timed
+from .wind import path_tangent
+
+
+def straight_path(start_coords, end_coords, grid=None, step=3000):
+    """
+    Projected coordinates of a straight path between two (lat, lon) points.
+
+    Points are spaced ``step`` metres apart along each axis and the shorter
+    axis is re-spaced to match the longer one, as the original scripts did,
+    but keeping its direction from start to end. Returns the projected x and y
+    arrays.
+    """
+    grid = grid or HRRRGrid()
+    proj_lon, proj_lat = grid.project([start_coords[0],end_coords[0]], [start_coords[1],end_coords[1]])
+
+    #generate paths between starting and ending points in projected units
+    proj_lon_path = np.arange(proj_lon[0],proj_lon[1],-step if proj_lon[0] > proj_lon[1] else step)
+    proj_lat_path = np.arange(proj_lat[0],proj_lat[1],-step if proj_lat[0] > proj_lat[1] else step)
+
+    #Adjust lengths of path arrays such that they are even, re-spacing the shorter one from its first to its last point
+    if len(proj_lon_path) < len(proj_lat_path):
+        proj_lon_path = respace(proj_lon_path, proj_lon[0], len(proj_lat_path))
+    elif len(proj_lat_path) < len(proj_lon_path):
+        proj_lat_path = respace(proj_lat_path, proj_lat[0], len(proj_lon_path))
+
+    return proj_lon_path, proj_lat_path
+
+
+def respace(path, start, count):
+    #count points from the first value of path towards (not including) its last, in path's direction
+    last = path[-1] if len(path) else start
+    return start + (last - start)*np.arange(count)/count
+
+
+def spaced_path(start_coords, end_coords, grid=None, spacing=3000, via=()):
+    """
+    Projected coordinates of a path sampled evenly every ``spacing`` metres.
+
+    Unlike ``straight_path`` both endpoints are kept and the points are spaced
+    along the path itself, so sections of any length come out at the requested
+    resolution. ``via`` adds intermediate (lat, lon) vertices, making the path
+    a polyline of straight (projected) segments. Returns the projected x and y
+    arrays.
+    """
+    grid = grid or HRRRGrid()
+    vertices = [start_coords, *via, end_coords]
+    px, py = grid.project([c[0] for c in vertices], [c[1] for c in vertices])
+
+    xs, ys = [], []
+    for i in range(len(vertices)-1):
+        length = np.hypot(px[i+1]-px[i], py[i+1]-py[i])
+        t = np.linspace(0, 1, max(2, int(round(length/spacing))+1))
+        #Drop the end of every segment but the last, it starts the next one
+        if i < len(vertices)-2:
+            t = t[:-1]
+        xs.append(px[i] + t*(px[i+1]-px[i]))
+        ys.append(py[i] + t*(py[i+1]-py[i]))
+    return np.concatenate(xs), np.concatenate(ys)
+
+
+def bilinear_weights(grid, px, py):
+    """
+    Flat indexes and weights of the 4 grid points surrounding each projected point.
+
+    Returns ``(index, weights)``, both of shape ``(points, 4)``. Points outside
+    the grid take the values of the nearest edge.
+    """
+    ny, nx = grid.shape
+    fy, fx = grid.fractional_index(px, py)
+    y0 = np.clip(np.floor(fy), 0, ny-2).astype(np.intp)
+    x0 = np.clip(np.floor(fx), 0, nx-2).astype(np.intp)
+    ty = np.clip(fy - y0, 0, 1)
+    tx = np.clip(fx - x0, 0, 1)
+
+    i00 = y0*nx + x0
+    index = np.stack([i00, i00+1, i00+nx, i00+nx+1], axis=-1)
+    weights = np.stack([(1-ty)*(1-tx), (1-ty)*tx, ty*(1-tx), ty*tx], axis=-1)
+    return index, weights
+
+
+def path_indexes(start_coords, end_coords, grid=None, step=3000):
+    """Nearest grid (row, column) indexes along a straight path, as two arrays."""
+    grid = grid or HRRRGrid()
+    proj_lon_path, proj_lat_path = straight_path(start_coords, end_coords, grid, step)
+    return grid.nearest_index(proj_lon_path, proj_lat_path)
+
+
+#Ways of sampling the grid along a path
+SAMPLINGS = ('nearest', 'bilinear')
+
+
+@dataclass(frozen=True)
+class Route:
+    """A named cross section path between two (lat, lon) points, optionally through ``via`` points."""
+
+    name: str
+    start: tuple
+    end: tuple
+    via: tuple = ()
+
+    def indexes(self, grid=None, step=3000):
+        return path_indexes(self.start, self.end, grid, step)
+
+    def plan(self, grid=None, step=3000, sampling='nearest', spacing=None):
+        """Precompute the PathPlan of this route."""
+        return PathPlan.build(self, grid, step, sampling, spacing)
+
+
+def load_routes(filename):
+    """
+    Read named routes from a JSON file.
+
+    The file maps route names to ``[[start_lat, start_lon], [end_lat, end_lon]]``;
+    polylines list their intermediate points in between.
+    """
+    with open(filename) as f:
+        routes = json.load(f)
+    return [Route(name, tuple(points[0]), tuple(points[-1]), tuple(tuple(p) for p in points[1:-1])) for name, points in routes.items()]
+
+
+@dataclass
+class PathPlan:
+    """
+    Precomputed sampling of a route on the grid.
+
+    Holds everything needed to pull a section out of a field without any
+    projection math: flattened grid indexes of each sample (``index``, shape
+    ``(points, k)``), their interpolation ``weights`` and the along-track
+    ``distance`` (km) of each sample. For wind components it also keeps the
+    path's unit ``tangent`` in the grid frame and the grid ``rotation`` angle at
+    each sample. Plans are built once per route and can be saved to disk and
+    loaded at startup.
+    """
+
+    name: str
+    start: tuple
+    end: tuple
+    #(ny, nx) of the grid the flat indexes refer to
+    shape: tuple
+    index: np.ndarray
+    weights: np.ndarray
+    distance: np.ndarray
+    sampling: str = 'nearest'
+    step: float = 3000
+    #Along-track sample spacing (m), None for the original per-axis stepping
+    spacing: float = None
+    #Intermediate (lat, lon) vertices of polyline routes
+    via: tuple = ()
+    #(points, 2) unit path tangent in the grid frame, and grid rotation (radians)
+    tangent: np.ndarray = None
+    rotation: np.ndarray = None
+
+    def __post_init__(self):
+        if self.tangent is None:
+            #Fall back to the direction between the sampled grid points
+            iy, ix = np.unravel_index(self.index, self.shape)
+            self.tangent = path_tangent(combine(ix, self.weights), combine(iy, self.weights))
+
+    @classmethod
+    @timed('plan')
+    def build(cls, route, grid=None, step=3000, sampling='nearest', spacing=None):
+        """
+        Plan a route along a straight path.
+
+        ``sampling`` is 'nearest' (snap each sample to the closest grid point)
+        or 'bilinear' (weight the 4 surrounding grid points). With ``spacing``
+        samples are placed evenly that many metres apart along the path;
+        otherwise nearest sampling of a straight route keeps the original
+        ``step`` construction, and bilinear sampling or polylines use ``step``
+        as the spacing.
+        """
+        if sampling not in SAMPLINGS:
+            raise ValueError(f"Unknown sampling '{sampling}', choose from: {', '.join(SAMPLINGS)}")
+        grid = grid or HRRRGrid()
+        if spacing is None and (sampling == 'bilinear' or route.via):
+            spacing = step
+        if spacing is None:
+            proj_lon_path, proj_lat_path = straight_path(route.start, route.end, grid, step)
+        else:
+            proj_lon_path, proj_lat_path = spaced_path(route.start, route.end, grid, spacing, route.via)
+        distance = np.concatenate([[0], np.cumsum(np.hypot(np.diff(proj_lon_path), np.diff(proj_lat_path)))])/1000
+        tangent = path_tangent(proj_lon_path, proj_lat_path)
+        rotation = grid.rotation(grid.unproject(proj_lon_path, proj_lat_path)[1])
+
+        if sampling == 'nearest':
+            iy, ix = grid.nearest_index(proj_lon_path, proj_lat_path)
+            plan = cls.from_indexes(iy, ix, grid.shape, distance, name=route.name, start=route.start, end=route.end, step=step)
+            plan.spacing, plan.via, plan.tangent, plan.rotation = spacing, tuple(route.via), tangent, rotation
+            return plan
+
+        index, weights = bilinear_weights(grid, proj_lon_path, proj_lat_path)
+        return cls(route.name, route.start, route.end, grid.shape, index, weights, distance, sampling, step, spacing, tuple(route.via), tangent, rotation)
+
+    @classmethod
+    def from_indexes(cls, iy, ix, shape, distance=None, name='', start=None, end=None, step=3000):
+        """Plan sampling the given (row, column) grid points directly."""
+        index = np.ravel_multi_index((np.asarray(iy), np.asarray(ix)), shape)[:, None]
+        if distance is None:
+            distance = np.arange(len(index), dtype=np.float64)
+        return cls(name, start, end, tuple(shape), index.astype(np.intp), np.ones(index.shape), np.asarray(distance, dtype=np.float64), step=step)
+
+    @property
+    def points(self):
+        return len(self.index)
+
+    @property
+    def iy(self):
+        return np.unravel_index(self.index, self.shape)[0]
+
+    @property
+    def ix(self):
+        return np.unravel_index(self.index, self.shape)[1]
+
+    def gather(self, field):
+        """Sample a field of shape ``(..., ny, nx)`` along the plan, giving ``(..., points)``."""
+        field = np.asarray(field)
+        flat = field.reshape(field.shape[:-2] + (-1,))
+        return combine(flat[..., self.index], self.weights)
+
+    def crop(self):
+        """
+        Bounding box of the plan's grid points and the indexes relative to it.
+
+        Returns ``((y slice, x slice), local)`` where ``local`` holds flat indexes
+        into the cropped window, shaped like ``index``.
+        """
+        iy, ix = np.unravel_index(self.index, self.shape)
+        y0, x0 = iy.min(), ix.min()
+        window = (slice(y0, iy.max()+1), slice(x0, ix.max()+1))
+        local = (iy - y0)*(ix.max()+1 - x0) + (ix - x0)
+        return window, local
+
+    def digest(self):
+        """Short hash of the sampling, changes whenever the indexes or weights do."""
+        h = hashlib.sha256()
+        for array in (self.index, self.weights):
+            h.update(np.ascontiguousarray(array).tobytes())
+        return h.hexdigest()[:16]
+
+    def describe(self):
+        """JSON-serializable description of the plan, used in cache keys."""
+        return {'start': self.start, 'end': self.end, 'via': self.via, 'sampling': self.sampling, 'step': self.step, 'spacing': self.spacing, 'digest': self.digest()}
+
+    def to_arrays(self, prefix=''):
+        meta = {'name': self.name, 'start': self.start, 'end': self.end, 'via': self.via, 'shape': self.shape, 'sampling': self.sampling, 'step': self.step, 'spacing': self.spacing}
+        arrays = {f'{prefix}index': self.index, f'{prefix}weights': self.weights, f'{prefix}distance': self.distance, f'{prefix}tangent': self.tangent, f'{prefix}meta': json.dumps(meta)}
+        if self.rotation is not None:
+            arrays[f'{prefix}rotation'] = self.rotation
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix=''):
+        meta = json.loads(str(arrays[f'{prefix}meta']))
+        start = tuple(meta['start']) if meta['start'] is not None else None
+        end = tuple(meta['end']) if meta['end'] is not None else None
+        tangent = arrays[f'{prefix}tangent'] if f'{prefix}tangent' in arrays else None
+        rotation = arrays[f'{prefix}rotation'] if f'{prefix}rotation' in arrays else None
+        return cls(meta['name'], start, end, tuple(meta['shape']), arrays[f'{prefix}index'], arrays[f'{prefix}weights'], arrays[f'{prefix}distance'], meta['sampling'], meta['step'], meta.get('spacing'), tuple(tuple(p) for p in meta.get('via', ())), tangent, rotation)
+
+
+def combine(values, weights):
+    """Weighted sum over the last axis of gathered ``values`` (``(..., points, k)``)."""
+    if weights.shape[-1] == 1:
+        return values[..., 0]
+    return np.einsum('...pk,pk->...p', values, weights.astype(values.dtype, copy=False))
+
+
+def stack_plans(plans):
+    """
+    Concatenate several plans on the same grid into one, for a single gather.
+
+    Returns the combined plan and the ``offsets`` of each plan's samples in it
+    (``len(plans)+1`` values). Plans with fewer interpolation points per sample
+    are padded with zero weights.
+    """
+    k = max(plan.index.shape[1] for plan in plans)
+    index, weights = [], []
+    for plan in plans:
+        pad = k - plan.index.shape[1]
+        index.append(np.concatenate([plan.index, np.repeat(plan.index[:, :1], pad, axis=1)], axis=1))
+        weights.append(np.concatenate([plan.weights, np.zeros((plan.points, pad))], axis=1))
+    offsets = np.concatenate([[0], np.cumsum([plan.points for plan in plans])])
+    distance = np.concatenate([plan.distance for plan in plans])
+    tangent = np.concatenate([plan.tangent for plan in plans])
+    rotation = None if any(plan.rotation is None for plan in plans) else np.concatenate([plan.rotation for plan in plans])
+    stacked = PathPlan('+'.join(plan.name for plan in plans), None, None, plans[0].shape, np.concatenate(index), np.concatenate(weights), distance, 'stacked',
+                       tangent=tangent, rotation=rotation)
+    return stacked, offsets
+
+
+def save_plans(filename, plans):
+    """Write several plans to one ``.npz`` file."""
+    arrays = {}
+    for plan in plans:
+        arrays.update(plan.to_arrays(f'{plan.name}/'))
+    arrays['names'] = json.dumps([plan.name for plan in plans])
+    np.savez(filename, **arrays)
+
+
+def load_plans(filename):
+    """Read plans written by ``save_plans``, as a dict keyed by route name."""
+    with np.load(filename) as npz:
+        return {name: PathPlan.from_arrays(npz, f'{name}/') for name in json.loads(str(npz['names']))}
@@ -0,0 +1,119 @@
+"""
+Derived thermodynamic variables, evaluated on extracted path columns.
+
+Every function takes plain arrays of hybrid-level data already sliced down to
+the cross section path (shape ``(levels, points)``), so the physics touches a
+few thousand columns rather than the full CONUS cube. Units follow the GRIB
+fields: temperature in K, pressure in Pa, specific humidity in kg/kg.
+"""
+
+import numpy as np
+
+from .profiling import timed
+
+
+def mixing_ratio(q):
+    """Water vapor mixing ratio (kg/kg) from specific humidity."""
+    return q/(1-q)
+
+
+def potential_temperature(t, pres):
+    """Potential temperature (K)."""
+    return t*(100000/pres)**(0.286)
+
+
+def _buffers(out, *arrays):
+    #Output array (given or new) and one scratch array, in the inputs' dtype
+    shape = np.broadcast_shapes(*(a.shape for a in arrays))
+    dtype = np.result_type(*arrays)
+    if out is None:
+        out = np.empty(shape, dtype)
+    return out, np.empty(shape, dtype)
+
+
+@timed('physics')
+def theta_e(t, pres, out=None):
+    """
+    Equivalent potential temperature (K), using the saturation mixing ratio.
+
+    The saturation vapor pressure, saturation mixing ratio and latent heat are
+    folded into a single expression evaluated with in-place ufuncs, so besides
+    ``out`` (allocated if not given) only one scratch array is used. The result
+    keeps the dtype of the inputs (float32 for extracted sections).
+    """
+    out, work = _buffers(out, t, pres)
+    #esw = 611.657*exp(24.921*(1-tr))*tr**5.06 with tr = 273.15/t, smr = 0.622*esw/pres
+    np.divide(273.15, t, out=work)
+    np.power(work, 5.06, out=out)
+    np.subtract(1, work, out=work)
+    work *= 24.921
+    np.exp(work, out=work)
+    out *= work
+    out /= pres
+    #Lv = 2834.1 - 0.29*t - 0.004*t**2
+    np.multiply(t, -0.004, out=work)
+    work -= 0.29
+    work *= t
+    work += 2834.1
+    out *= work
+    out *= 0.622*611.657/1005.7
+    out /= t
+    np.exp(out, out=out)
+    #Potential temperature
+    np.divide(100000, pres, out=work)
+    np.power(work, 0.286, out=work)
+    work *= t
+    out *= work
+    return out
+
+
+@timed('physics')
+def relative_humidity(t, pres, q, out=None):
+    """Relative humidity (%) approximation from temperature, pressure and specific humidity."""
+    out, work = _buffers(out, t, pres, q)
+    #0.263*pres*q/exp(17.67*(t-273.15)/(t-29.65))
+    np.subtract(t, 273.15, out=work)
+    work *= 17.67
+    np.subtract(t, 29.65, out=out)
+    work /= out
+    np.exp(work, out=work)
+    np.multiply(pres, q, out=out)
+    out *= 0.263
+    out /= work
+    return out
+
+
+#Derived variable name -> (function, names of the input fields in argument order)
+DERIVED = {
+    'mr': (mixing_ratio, ('q',)),
+    'theta': (potential_temperature, ('t','pres')),
+    'theta_e': (theta_e, ('t','pres')),
+    'rh': (relative_humidity, ('t','pres','q')),
+}
+
+
+def inputs_for(names):
+    """Raw field names needed to compute the given raw or derived variables."""
+    needed = []
+    for name in names:
+        for field in DERIVED[name][1] if name in DERIVED else (name,):
+            if field not in needed:
+                needed.append(field)
+    return needed
+
+
+def derive(columns, names):
+    """
+    Evaluate derived variables from a mapping of extracted path columns.
+
+    ``columns`` maps raw field names (``t``, ``pres``, ``q`` ...) to arrays.
+    Returns a dict of the requested names; raw names are passed through.
+    """
+    out = {}
+    for name in names:
+        if name in DERIVED:
+            func, args = DERIVED[name]
+            out[name] = func(*(columns[a] for a in args))
+        else:
+            out[name] = columns[name]
+    return out
@@ -0,0 +1,46 @@
+"""
+Bounded background prefetch, overlapping loading of the next items with work on the current one.
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+#Default number of items loaded ahead of the consumer
+PREFETCH_DEPTH = 2
+
+
+def prefetch(items, load, depth=PREFETCH_DEPTH, process=True):
+    """
+    Yield ``(item, result, error)`` for each item in order, loading up to ``depth`` items ahead.
+
+    ``load(item)`` runs in one background process (or thread, with
+    ``process=False``) while the caller works on earlier results. A process
+    sidesteps the GIL, so GRIB decoding really runs alongside matplotlib;
+    ``load`` must then be picklable (a module-level function or a partial of
+    one). At most ``depth`` items are loaded or in flight at a time, so a slow
+    consumer stalls the loader instead of piling up memory. Exceptions raised
+    by ``load`` are returned as ``error`` (with ``result`` None) rather than
+    ending the stream. Closing the generator early cancels the pending loads.
+    """
+    items = iter(items)
+    pending = deque()
+    executor = ProcessPoolExecutor(max_workers=1) if process else ThreadPoolExecutor(max_workers=1)
+    try:
+        for item in items:
+            pending.append((item, executor.submit(load, item)))
+            if len(pending) >= max(1, depth):
+                break
+        while pending:
+            item, future = pending.popleft()
+            try:
+                result, error = future.result(), None
+            except Exception as e:
+                result, error = None, e
+            #Keep the loader busy while the caller works on this item
+            for following in items:
+                pending.append((following, executor.submit(load, following)))
+                break
+            yield item, result, error
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
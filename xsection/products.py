@@ -0,0 +1,250 @@
+"""
+Cross section products and the registry the renderer draws them from.
+
+A product names the raw GRIB fields it needs, how its main field is color
+filled (colormap, bins, range) and supplies a ``draw`` function that computes
+that field and adds any contour lines. New variables only need a registered
+draw function here, not a copied script.
+"""
+
+import functools
+import hashlib
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+
+from .physics import theta_e, relative_humidity
+from .vertical import remap_columns
+
+
+@dataclass
+class Product:
+    """A registered cross section product."""
+
+    name: str
+    #Raw GRIB short names that must be extracted along the path
+    variables: tuple
+    #draw(ax, x, y, section) -> field to color fill; draws the contour lines itself
+    draw: Callable
+    title: str
+    #Colorbar ticks
+    ticks: np.ndarray
+    #Colormap, or a factory returning one (see ``segmented``)
+    cmap: object
+    #Full-fidelity contourf levels
+    bins: np.ndarray
+    vmin: float
+    vmax: float
+    #Pressure range shown, bottom and top (hPa)
+    ylim: tuple = (1000, 100)
+    extend: str = 'neither'
+    #Hatch values past the top bin
+    hatch_over: bool = False
+
+    @property
+    def colormap(self):
+        from matplotlib import colors
+        return self.cmap if isinstance(self.cmap, colors.Colormap) else self.cmap()
+
+    @property
+    def norm(self):
+        from matplotlib import colors
+        return colors.Normalize(self.vmin, self.vmax)
+
+    def describe(self):
+        """
+        JSON-serializable description of everything that shapes the product's image, used in fingerprints.
+
+        Colormaps made by ``segmented`` are described by their colors without
+        building them; other colormaps by a hash of their lookup table. The
+        draw function is described by a hash of its bytecode and constants.
+        """
+        if hasattr(self.cmap, 'spec'):
+            cmap = self.cmap.spec
+        else:
+            lut = self.colormap(np.linspace(0, 1, self.colormap.N))
+            cmap = {'name': self.colormap.name, 'lut': hashlib.sha256(np.ascontiguousarray(lut).tobytes()).hexdigest()[:16]}
+        code = self.draw.__code__
+        draw = hashlib.sha256(code.co_code + repr(code.co_consts).encode()).hexdigest()[:16]
+        return {'name': self.name, 'variables': list(self.variables), 'title': self.title, 'ticks': self.ticks.tolist(), 'cmap': cmap,
+                'bins': hashlib.sha256(np.ascontiguousarray(self.bins).tobytes()).hexdigest()[:16], 'vmin': self.vmin, 'vmax': self.vmax,
+                'ylim': list(self.ylim), 'extend': self.extend, 'hatch_over': self.hatch_over, 'draw': f'{self.draw.__module__}.{self.draw.__qualname__}:{draw}'}
+
+
+PRODUCTS = {}
+
+
+def register_product(name, variables, title, ticks, cmap, bins, vmin, vmax, ylim=(1000, 100), extend='neither', hatch_over=False):
+    """Decorator registering a draw function as a product."""
+    def decorator(draw):
+        PRODUCTS[name] = Product(name, tuple(variables), draw, title, np.asarray(ticks), cmap, np.asarray(bins), vmin, vmax, tuple(ylim), extend, hatch_over)
+        return draw
+    return decorator
+
+
+def get_product(name):
+    try:
+        return PRODUCTS[name]
+    except KeyError:
+        raise ValueError(f"Unknown product '{name}', choose from: {', '.join(PRODUCTS)}") from None
+
+
+def variables_for(products):
+    """Union of the raw variables needed by several products, in first-seen order."""
+    variables = []
+    for product in products:
+        product = get_product(product) if isinstance(product, str) else product
+        variables += [v for v in product.variables if v not in variables]
+    return variables
+
+
+#Fill rendering modes:
+#  full   - contourf with the product's fine bins (0.1 unit steps, over a thousand levels)
+#  fast   - contourf with FAST_LEVELS levels over the same range
+#  raster - the field resampled onto RASTER_ROWS even log-pressure rows and drawn as one image
+#           in FAST_LEVELS color steps, no contour polygons at all
+FIDELITIES = ('full', 'fast', 'raster')
+FAST_LEVELS = 64
+RASTER_ROWS = 400
+
+
+def fill(ax, x, y, z, product, fidelity='full'):
+    """Color-fill a product's field at the requested fidelity and return the artist."""
+    bins, cmap = product.bins, product.colormap
+
+    if fidelity == 'raster':
+        from matplotlib import colors
+
+        #Rows evenly spaced in log pressure, bottom to top; below-ground points are NaN (transparent)
+        rows = np.linspace(np.nanmax(y), np.nanmin(y), RASTER_ROWS)
+        image = remap_columns(np.exp(y), z, np.exp(rows), log=True)
+        norm = colors.BoundaryNorm(np.linspace(bins[0], bins[-1], FAST_LEVELS+1), cmap.N, extend=product.extend)
+        half = (rows[0] - rows[1])/2
+        mesh = ax.imshow(image, cmap=cmap, norm=norm, origin='lower', aspect='auto', interpolation='nearest', zorder=0,
+                         extent=(x[0, 0] - 0.5, x[0, -1] + 0.5, rows[0] + half, rows[-1] - half))
+        if product.hatch_over:
+            ax.contourf(x,y,z,[bins[-1],np.inf],colors='none',hatches=['///'],zorder=0)
+        return mesh
+
+    if fidelity == 'fast':
+        bins = np.linspace(bins[0], bins[-1], FAST_LEVELS+1)
+    elif fidelity != 'full':
+        raise ValueError(f"Unknown fidelity '{fidelity}', choose from: {', '.join(FIDELITIES)}")
+
+    hatches = ['']*(len(bins)-1) + ['///'] if product.hatch_over else [None]
+    return ax.contourf(x,y,z,bins,cmap=cmap,vmin=product.vmin,vmax=product.vmax,zorder=0,extend=product.extend,hatches=hatches)
+
+
+def segmented(color_list, name='custom blue', **extremes):
+    """
+    Factory of a 256-step LinearSegmentedColormap through ``color_list``.
+
+    The colormap (and matplotlib) is only built on first use, so the product
+    registry can be imported by data-only runs without loading matplotlib.
+    """
+    @functools.lru_cache(maxsize=None)
+    def build():
+        from matplotlib import colors
+        cmap = colors.LinearSegmentedColormap.from_list(name, color_list, N=256)
+        return cmap.with_extremes(**extremes) if extremes else cmap
+    build.spec = {'name': name, 'colors': list(color_list), **extremes}
+    return build
+
+
+def label_contours(ax, cc, bins_cc, color):
+    #Label contour levels with their bin values
+    fmt = {}
+    for l, s in zip(cc.levels, bins_cc):
+        fmt[l] = s
+    return ax.clabel(cc, cc.levels, inline=True, fmt=fmt, fontsize=8, colors=color)
+
+
+#---------- Temperature ----------#
+
+
+TEMPERATURE_CMAP = segmented(['#FB68B3','#ED96CA','#D7B7D8','#9EDCE7','#27665B','#3E8070','#D3D3D3','#4A1E85','#7E1E4A','#CD7676','#F7E7E7','#7EB8D9','#6262A1','#FFFF78','#FD8F23','#B02A1B'])
+
+
+@register_product('temperature', ['pres','t'], 'HRRR Cross Section, Temperature (fill, dashed contour, °F)', np.arange(-60,81,10),
+                  TEMPERATURE_CMAP, np.arange(-60,80.1,0.1), -60, 80, ylim=(1000,300))
+def draw_temperature(ax, x, y, section):
+    z = section['t'] - 273.15
+    z *= 9/5
+    z += 32
+
+    bins_cc = [-60,-50,-40,-30,-20,-10,0,10,20,30,40,50,60,70]
+    cc = ax.contour(x,y,z,bins_cc,zorder=1,colors='#2e2e2e',linestyles='dashed',linewidths=0.5)
+    label_contours(ax, cc, bins_cc, '#2e2e2e')
+    return z
+
+
+#---------- Relative humidity ----------#
+
+
+RH_CMAP = segmented(['#532F05','#8B500E','#BF812C','#DEC07B','#F6E8C3','#C6EAE5','#7ECCC0','#35978F','#01655D','#003B2F'])
+
+
+@register_product('rh', ['pres','t','q'], 'HRRR Cross Section, Relative Humidity (fill, dashed contour, %)', np.arange(0,110,10),
+                  RH_CMAP, np.arange(0,101.1,0.1), 0, 101, ylim=(1030,500))
+def draw_rh(ax, x, y, section):
+    z = relative_humidity(section['t'], section['pres'], section['q'])
+
+    bins_cc = np.arange(0,110,10)
+    cc = ax.contour(x,y,z,bins_cc,zorder=1,colors='#2e2e2e',linestyles='dashed',linewidths=0.5)
+    label_contours(ax, cc, bins_cc, '#2e2e2e')
+    return z
+
+
+#---------- Wind speed and theta-e ----------#
+
+
+WIND_CMAP = segmented(['#FFFFFF','#D4D3D3','#1D6EEB','#97D3FB','#37D33C','#FFEA78','#FD3719','#5F423B','#E4BFB6','#F0A5A1','#E75E5E','#D93939','#6e1e1e','#480a0a'], over='#55133c')
+
+
+@register_product('wind', ['pres','t','u','v'], 'HRRR Cross Section, Wind Speed (fill, solid contour, mph), Theta-e (dashed contour, K)', np.arange(0,141,10),
+                  WIND_CMAP, np.arange(0,140.1,0.1), 0, 140, extend='max', hatch_over=True)
+def draw_wind(ax, x, y, section):
+    z = np.hypot(section['u'], section['v'])
+    z *= 2.23694
+
+    bins_cc = [20,40,60,80,100,120,140,160,180,200]
+    cw = ax.contour(x,y,z,bins_cc,zorder=1,colors='white',linestyles='solid',linewidths=0.5)
+    label_contours(ax, cw, bins_cc, 'white')
+
+    bins_cc = np.arange(200,405,5)
+    cc = ax.contour(x,y,theta_e(section['t'], section['pres']),bins_cc,zorder=1,colors='#2e2e2e',linestyles='dashed',linewidths=0.5)
+    label_contours(ax, cc, bins_cc, '#2e2e2e')
+    return z
+
+
+#---------- Along and normal wind ----------#
+
+
+COMPONENT_CMAP = segmented(['#2B0A4F','#2F3FA6','#3C8DD9','#A6D5F2','#FFFFFF','#F8C7B0','#E8684A','#B01D1D','#4F0A0A'], 'custom diverging')
+
+
+def draw_component(ax, x, y, section, name):
+    #Wind component in mph, solid contours where positive, dashed where negative
+    z = section[name]*2.23694
+
+    bins_cc = [-100,-80,-60,-40,-20,20,40,60,80,100]
+    cw = ax.contour(x,y,z,bins_cc,zorder=1,colors='#2e2e2e',linewidths=0.5)
+    label_contours(ax, cw, bins_cc, '#2e2e2e')
+
+    bins_cc = np.arange(200,405,5)
+    cc = ax.contour(x,y,theta_e(section['t'], section['pres']),bins_cc,zorder=1,colors='#5e5e5e',linestyles='dashed',linewidths=0.5)
+    label_contours(ax, cc, bins_cc, '#5e5e5e')
+    return z
+
+
+@register_product('along', ['pres','t','along'], 'HRRR Cross Section, Along-Section Wind (fill, mph, + start to end), Theta-e (dashed contour, K)', np.arange(-100,101,20),
+                  COMPONENT_CMAP, np.arange(-100,100.1,0.1), -100, 100, extend='both')
+def draw_along(ax, x, y, section):
+    return draw_component(ax, x, y, section, 'along')
+
+
+@register_product('normal', ['pres','t','normal'], 'HRRR Cross Section, Section-Normal Wind (fill, mph, + toward left of path), Theta-e (dashed contour, K)', np.arange(-100,101,20),
+                  COMPONENT_CMAP, np.arange(-100,100.1,0.1), -100, 100, extend='both')
+def draw_normal(ax, x, y, section):
+    return draw_component(ax, x, y, section, 'normal')
@@ -0,0 +1,146 @@
+"""
+Opt-in stage timing for the cross section pipeline.
+
+Stages (file open, plan, extraction, physics, remap, contour, savefig) are
+wrapped in ``stage`` blocks that cost nothing unless profiling is enabled.
+When it is, each stage records wall time, CPU time, the process's peak RSS and
+the bytes read (from ``/proc/self/io``), and every rendered frame is written
+as one JSON line holding its stages, so a whole batch can be aggregated
+afterwards. Stages may nest (physics runs inside contour). Stages that run
+outside a frame, such as extraction in a prefetch process, are written as
+lines of their own.
+
+Profiling is switched on through environment variables, so process-pool
+workers started afterwards inherit it::
+
+    enable('profile.jsonl', cprofile_dir='prof/')
+"""
+
+import cProfile
+import functools
+import json
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+
+
+#JSON lines file to append records to, and directory for per-frame cProfile dumps
+PROFILE_ENV = 'XSECTION_PROFILE'
+CPROFILE_ENV = 'XSECTION_CPROFILE'
+
+_local = threading.local()
+_write_lock = threading.Lock()
+
+
+def enable(path, cprofile_dir=None):
+    """Append profiling records to ``path``, and dump a cProfile per frame into ``cprofile_dir``."""
+    os.environ[PROFILE_ENV] = os.path.abspath(path)
+    if cprofile_dir:
+        os.makedirs(cprofile_dir, exist_ok=True)
+        os.environ[CPROFILE_ENV] = os.path.abspath(cprofile_dir)
+
+
+def enabled():
+    return bool(os.environ.get(PROFILE_ENV))
+
+
+def io_counters():
+    """(bytes read through syscalls, bytes read from storage) of this process, or (None, None) off Linux."""
+    try:
+        with open('/proc/self/io') as f:
+            counters = dict(line.split(':') for line in f)
+        return int(counters['rchar']), int(counters['read_bytes'])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def peak_rss():
+    """Peak resident set size of this process so far (bytes)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss*1024
+
+
+class _Meter:
+    #Wall, CPU and read counters from construction until ``stop``
+    def __init__(self):
+        self.wall, self.cpu = time.perf_counter(), time.process_time()
+        self.rchar, self.read_bytes = io_counters()
+
+    def stop(self):
+        rchar, read_bytes = io_counters()
+        return {'seconds': time.perf_counter() - self.wall, 'cpu_seconds': time.process_time() - self.cpu, 'peak_rss': peak_rss(),
+                'bytes_read': None if rchar is None else rchar - self.rchar,
+                'disk_bytes_read': None if read_bytes is None else read_bytes - self.read_bytes}
+
+
+def emit(record):
+    """Append one JSON line to the profile file."""
+    line = json.dumps({'pid': os.getpid(), **record}, default=str) + '\n'
+    with _write_lock, open(os.environ[PROFILE_ENV], 'a') as f:
+        f.write(line)
+
+
+@contextmanager
+def stage(name, **info):
+    """Time the enclosed block as stage ``name`` of the current frame (no-op unless enabled)."""
+    if not enabled():
+        yield
+        return
+    meter = _Meter()
+    try:
+        yield
+    finally:
+        record = {'stage': name, **info, **meter.stop()}
+        stages = getattr(_local, 'stages', None)
+        if stages is None:
+            emit(record)
+        else:
+            stages.append(record)
+
+
+def timed(name):
+    """Decorator running a function as a ``stage``."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled():
+                return func(*args, **kwargs)
+            with stage(name, func=func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def frame(**info):
+    """
+    Collect the stages of one rendered frame and write them as a single JSON line.
+
+    ``info`` (file, hour, ...) is stored with the record. With a cProfile
+    directory configured, the frame is also profiled and dumped there.
+    """
+    if not enabled() or getattr(_local, 'stages', None) is not None:
+        yield
+        return
+    _local.stages = []
+    profiler = None
+    if os.environ.get(CPROFILE_ENV):
+        profiler = cProfile.Profile()
+        profiler.enable()
+    meter = _Meter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = repr(e)
+        raise
+    finally:
+        record = {'frame': info, **meter.stop(), 'error': error, 'stages': _local.stages}
+        _local.stages = None
+        if profiler is not None:
+            profiler.disable()
+            label = '.'.join(os.path.basename(str(v)) for v in info.values()).replace(os.sep, '_') or 'frame'
+            record['cprofile'] = os.path.join(os.environ[CPROFILE_ENV], f'{label}.{os.getpid()}.prof')
+            profiler.dump_stats(record['cprofile'])
+        emit(record)
@@ -0,0 +1,213 @@
+"""
+Lazy point extraction from HRRR hybrid-level files.
+
+Fields are never decoded into memory whole. Each variable is cropped to the
+bounding box of the path's indexes and read a few levels at a time. A GRIB
+message is decoded at full grid size before the crop applies, so reads are
+grouped by full-grid bytes per level: the transient memory of a read stays
+under ``max_bytes`` (at least one level), and what is kept is proportional to
+path length x levels. With ``threads`` the GRIB messages of the needed
+variable/level pairs are decoded across a thread pool instead, each thread
+through its own file handle, gathering straight into the shared output.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from .path import PathPlan, combine, stack_plans
+from .profiling import stage
+from .section import Section, field_dtype
+from .wind import WIND_COMPONENTS, wind_components, wind_inputs
+
+
+#Default ceiling on the decoded (full-grid) size of a single read (bytes)
+MAX_READ_BYTES = 64*2**20
+
+
+def open_hybrid(filename, lock=None):
+    """
+    Open the hybrid-level messages of a HRRR ``wrfnat`` file without loading any data.
+
+    NetCDF files laid out like cfgrib's view of a ``wrfnat`` file (the
+    benchmark fixtures) are opened as they are. ``lock=False`` drops cfgrib's
+    process-wide decode lock, for handles that are only used by one thread.
+    """
+    import xarray as xr
+
+    if str(filename).endswith('.nc'):
+        return xr.open_dataset(filename)
+    return xr.open_dataset(filename, filter_by_keys={'typeOfLevel': 'hybrid'}, lock=lock)
+
+
+def parse_time(value):
+    """datetime (to the hour) of a numpy datetime64 coordinate value."""
+    return datetime.strptime(str(value)[0:13], '%Y-%m-%dT%H')
+
+
+class PathReader:
+    """
+    Read path columns out of a single forecast file.
+
+    ``max_bytes`` bounds how much full-grid data is decoded per read; levels are
+    grouped so that each read stays under it (but always at least one level).
+    With ``threads`` > 1, variables and levels are decoded in parallel by a
+    pool of that many threads (eccodes releases the GIL while decoding), which
+    cuts the latency of a single frame on a multi-core machine. The pool and
+    its per-thread file handles live until ``close``.
+    """
+
+    def __init__(self, filename, max_bytes=MAX_READ_BYTES, threads=1):
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.threads = threads
+        self._ds = None
+        self._pool = None
+        self._local = threading.local()
+        self._handles = []
+        self._handles_lock = threading.Lock()
+
+    @property
+    def ds(self):
+        if self._ds is None:
+            with stage('open', file=str(self.filename)):
+                self._ds = open_hybrid(self.filename)
+        return self._ds
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        for ds in self._handles:
+            ds.close()
+        self._handles = []
+        self._local = threading.local()
+        if self._ds is not None:
+            self._ds.close()
+            self._ds = None
+
+    def _thread_ds(self):
+        #File handle of the calling pool thread, opened on its first task
+        ds = getattr(self._local, 'ds', None)
+        if ds is None:
+            ds = self._local.ds = open_hybrid(self.filename, lock=False)
+            with self._handles_lock:
+                self._handles.append(ds)
+        return ds
+
+    def map(self, func, tasks):
+        """Run ``func`` over ``tasks`` on the reader's thread pool (created on first use); returns the results in order."""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='xsection-decode')
+        return list(self._pool.map(func, tasks))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def times(self):
+        """(init, valid) datetimes of the file."""
+        return parse_time(self.ds.time.data), parse_time(self.ds.valid_time.data)
+
+    def extract(self, iy, ix, variables):
+        """
+        Extract ``variables`` at grid points ``(iy, ix)`` into a Section.
+
+        ``iy``/``ix`` are the row and column indexes of the path points.
+        """
+        shape = self.ds.latitude.shape
+        return self.extract_plan(PathPlan.from_indexes(iy, ix, shape), variables)
+
+    def extract_plan(self, plan, variables, levels=None):
+        """
+        Extract ``variables`` along a precomputed PathPlan into a Section.
+
+        Wind components (wind.WIND_COMPONENTS) are computed from u and v with the
+        plan's tangent and rotation; u and v are only kept if also requested.
+        ``levels`` (a slice of hybrid level indexes) limits the decode to those
+        levels; 2D fields are read whole.
+        """
+        window, local = plan.crop()
+
+        with stage('extraction', points=plan.points, variables=len(variables)):
+            fields = self.read_many(wind_inputs(variables), window, local, plan.weights, levels)
+            components = [name for name in variables if name in WIND_COMPONENTS]
+            if components:
+                fields.update(wind_components(fields['u'], fields['v'], plan.tangent, plan.rotation, components))
+            fields = {name: fields[name] for name in variables}
+
+        lat = combine(np.asarray(self.ds.latitude[window].data).reshape(-1)[local], plan.weights)
+        lon = combine(np.asarray(self.ds.longitude[window].data).reshape(-1)[local], plan.weights)
+        init, valid = self.times()
+        return Section(fields, lat, lon, init, valid, attrs={'source': str(self.filename), 'route': plan.name}, distance=plan.distance)
+
+    def extract_many(self, plans, variables):
+        """
+        Extract ``variables`` along several plans with one gather per variable and level.
+
+        The plans' samples are stacked, read together from a single decode of
+        each field and split back into one Section per plan.
+        """
+        stacked, offsets = stack_plans(plans)
+        section = self.extract_plan(stacked, variables)
+        return [section.slice(offsets[i], offsets[i+1], plan.distance, route=plan.name) for i, plan in enumerate(plans)]
+
+    def read_columns(self, name, window, local, weights, levels=None):
+        """
+        Columns of one variable at the ``local`` points of a cropped ``window``.
+
+        ``local`` holds flat indexes into the window, shape ``(points, k)``, and
+        the ``k`` values of each point are combined with ``weights``. Only the
+        ``levels`` slice is read, if given. Columns come back in
+        section.field_dtype.
+        """
+        out, blocks = self._column_blocks(self.ds, name, window, local, levels=levels)
+        for block in blocks:
+            self._read_block(self.ds, name, window, block, local, weights, out)
+        return out
+
+    def read_many(self, names, window, local, weights, levels=None):
+        """
+        Columns of several variables, as a dict of name -> read_columns result.
+
+        With ``threads`` > 1 every variable/level pair is a task of the thread
+        pool, decoded through the worker's own handle and gathered into its
+        slice of a preallocated output.
+        """
+        if self.threads <= 1:
+            return {name: self.read_columns(name, window, local, weights, levels) for name in names}
+        fields, tasks = {}, []
+        for name in names:
+            fields[name], blocks = self._column_blocks(self.ds, name, window, local, step=1, levels=levels)
+            tasks += [(name, block) for block in blocks]
+        self.map(lambda task: self._read_block(self._thread_ds(), task[0], window, task[1], local, weights, fields[task[0]]), tasks)
+        return fields
+
+    def _column_blocks(self, ds, name, window, local, step=None, levels=None):
+        #Preallocated output of one variable and the (file levels, output rows) slices to read into it; (None, None) for a 2D field
+        da = ds[name]
+        if da.ndim == 2:
+            return np.empty(len(local), dtype=field_dtype()), [(None, None)]
+        start, stop, _ = (levels or slice(None)).indices(da.shape[0])
+        if step is None:
+            #Messages decode whole before the window crop, so size reads by the full grid
+            level_bytes = int(np.prod(da.shape[-2:]))*da.dtype.itemsize
+            step = max(1, int(self.max_bytes//max(level_bytes, 1)))
+        blocks = [(slice(k, min(k+step, stop)), slice(k-start, min(k+step, stop)-start)) for k in range(start, stop, step)]
+        return np.empty((max(stop-start, 0), len(local)), dtype=field_dtype()), blocks
+
+    def _read_block(self, ds, name, window, block, local, weights, out):
+        #Decode the file levels of one variable within window and gather them into their rows of out
+        levels, rows = block
+        da = ds[name]
+        ydim, xdim = da.dims[-2:]
+        da = da.isel({ydim: window[0], xdim: window[1]})
+        if levels is None:
+            out[...] = combine(np.asarray(da.data).reshape(-1)[local].astype(out.dtype, copy=False), weights)
+            return
+        data = np.asarray(da.isel({da.dims[0]: levels}).data)
+        out[rows] = combine(data.reshape(len(data), -1)[:, local].astype(out.dtype, copy=False), weights)
@@ -0,0 +1,182 @@
+"""
+Render one or more products from a single pass over a forecast file.
+
+Importing this module loads matplotlib; it selects the headless Agg backend
+unless a backend was chosen already (MPLBACKEND, or pyplot imported first).
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+import matplotlib
+
+if 'matplotlib.pyplot' not in sys.modules and 'MPLBACKEND' not in os.environ:
+    matplotlib.use('Agg')
+
+import matplotlib.cm as cm
+import matplotlib.pyplot as plt
+
+from .path import PathPlan, Route
+from .products import fill, get_product, variables_for
+from .profiling import frame, stage
+from .reader import PathReader
+from .vertical import remap_section
+
+
+#Resolution of saved figures (dots per inch)
+DPI = 200
+
+#Log-pressure ticks (hPa), every other one labelled
+PRESSURE_TICKS = [1000,950,900,850,800,750,700,650,600,550,500,450,400,350,300,250,200,150,100,75,50,25,10]
+PRESSURE_LABELS = ['1000','','900','','800','','700','','600','','500','','400','','300','','200','','100','','50','','10']
+
+
+def section_axes(section):
+    """Plotting coordinates of a section: path point index and log pressure (hPa)."""
+    if section.attrs.get('vertical') == 'pressure':
+        #Remapped sections sit on a regular grid, masked below ground in the data
+        levels = np.asarray(section.attrs['levels'])
+        y = np.broadcast_to(np.log(levels)[:, None], (len(levels), section.points))
+    else:
+        y = np.log(section['pres']/100)
+    x = np.broadcast_to(np.arange(0,section.points,1), y.shape)
+    return x, y
+
+
+class FigureTemplate:
+    """
+    A product's figure, built once and redrawn for each new section.
+
+    The figure, axes, colorbar, pressure ticks, labels and title are static;
+    ``draw`` only replaces the data artists (fills, contours and their labels),
+    the x ticks and the init/valid text, so a batch can reuse one figure for
+    every frame of a product. With a ``locator`` (locator.Locator) the figure
+    also carries a locator map inset in the upper right.
+    """
+
+    def __init__(self, product, fidelity='full', locator=None):
+        self.product = get_product(product) if isinstance(product, str) else product
+        self.fidelity = fidelity
+        self._artists = []
+
+        #Initialize plot
+        self.fig, self.ax = plt.subplots(figsize=(10,5.625))
+        self.ax.set_facecolor('#676668')
+
+        mappable = cm.ScalarMappable(norm=self.product.norm, cmap=self.product.colormap)
+        cb = self.fig.colorbar(mappable, ax=self.ax, extend=self.product.extend)
+        cb.set_ticks(self.product.ticks)
+        cb.set_ticklabels([f'{t:g}' for t in self.product.ticks])
+
+        self.ax.set_yticks(np.log(PRESSURE_TICKS),PRESSURE_LABELS)
+        self.ax.set_ylim(np.log(self.product.ylim[0]),np.log(self.product.ylim[1]))
+        self.ax.set_ylabel('Pressure (hPa)')
+
+        self.fig.text(0.13,0.89,self.product.title)
+        self.time_text = self.fig.text(0.13,0.92,'')
+        self.inset = locator.attach(self.ax) if locator is not None else None
+
+    def draw(self, section, start_coords, end_coords):
+        """Swap in the data of a new section and return the figure."""
+        for artist in self._artists:
+            #Contour labels go with their contour set, so skip anything already detached
+            if artist.axes is not None:
+                artist.remove()
+        before = set(self.ax.get_children())
+
+        x, y = section_axes(section)
+        with stage('contour', product=self.product.name, fidelity=self.fidelity):
+            z = self.product.draw(self.ax, x, y, section)
+            fill(self.ax, x, y, z, self.product, self.fidelity)
+        self._artists = [a for a in self.ax.get_children() if a not in before]
+
+        self.ax.set_xlim(0,section.points-1)
+        self.ax.set_xticks([0,section.points-1],[f'{round(start_coords[0],1)}N, {round(start_coords[1],1)}W',f'{round(end_coords[0],1)}N, {round(end_coords[1],1)}W'])
+
+        dt_form_valid = section.valid.strftime('%Hz %b %d, %Y')
+        dt_form_init = section.init.strftime('%Hz %b %d, %Y')
+        self.time_text.set_text(f'Init: {dt_form_init}     Valid: {dt_form_valid}')
+        if self.inset is not None:
+            with stage('locator'):
+                self.inset.update(section)
+        return self.fig
+
+    def save(self, filename, dpi=DPI):
+        with stage('savefig', product=self.product.name):
+            self.fig.savefig(filename,bbox_inches='tight',dpi=dpi)
+        return filename
+
+    def close(self):
+        plt.close(self.fig)
+
+
+#Templates kept for reuse within this process, keyed by (product, fidelity, locator settings)
+_templates = {}
+
+
+def get_template(product, fidelity='full', locator=None):
+    """Shared FigureTemplate of a product, created on first use."""
+    name = product if isinstance(product, str) else product.name
+    #Pool workers receive a fresh copy of the locator with every task, so key on its settings
+    key = (name, fidelity, json.dumps(locator.describe(), sort_keys=True, default=str) if locator is not None else None)
+    if key not in _templates:
+        _templates[key] = FigureTemplate(product, fidelity, locator)
+    return _templates[key]
+
+
+def draw_section(section, product, start_coords, end_coords, fidelity='full', locator=None):
+    """Draw a product onto a new figure and return it. ``fidelity`` is one of products.FIDELITIES."""
+    return FigureTemplate(product, fidelity, locator).draw(section, start_coords, end_coords)
+
+
+def render_section(section, product, start_coords, end_coords, filename, fidelity='full', locator=None, dpi=DPI):
+    """Draw a product and save it to ``filename`` at ``dpi``, reusing this process's template for the product."""
+    template = get_template(product, fidelity, locator)
+    template.draw(section, start_coords, end_coords)
+    return template.save(filename, dpi)
+
+
+def render_products(filename, start_coords, end_coords, products, output='./{product}.png', grid=None, cache=None, sampling='nearest', spacing=None, fidelity='full', vertical='native', locator=None, threads=1):
+    """
+    Render several products for one path from a single read of ``filename``.
+
+    Every variable needed by any of the products is extracted in one pass, then
+    each product is drawn from the shared section. ``output`` is formatted with
+    the product name. With a SectionCache the extracted section is reused
+    across runs. ``sampling``/``spacing`` are passed to PathPlan.build and
+    ``fidelity`` to the renderer. ``vertical='pressure'`` remaps the section
+    onto fixed isobaric levels before drawing, and a ``locator`` adds the
+    locator map inset. ``threads`` > 1 decodes the file's messages in parallel
+    (see PathReader).
+    Returns the list of written files.
+    """
+    route = Route('', tuple(start_coords), tuple(end_coords))
+    return render_routes(filename, [route], products, output, grid, cache, sampling, spacing, fidelity, vertical, locator, threads)
+
+
+def render_routes(filename, routes, products, output='./{route}.{product}.png', grid=None, cache=None, sampling='nearest', spacing=None, fidelity='full', vertical='native', locator=None, threads=1):
+    """
+    Render several products for many routes from a single read of ``filename``.
+
+    ``routes`` are Routes or PathPlans. All of them are extracted with one
+    gather per variable and level, then split back into per-route sections.
+    ``output`` is formatted with the route and product names. Sections are
+    cached on native levels and remapped per ``vertical`` afterwards. Returns
+    the list of written files.
+    """
+    products = [get_product(p) for p in products]
+    variables = variables_for(products)
+
+    plans = [r if isinstance(r, PathPlan) else r.plan(grid, sampling=sampling, spacing=spacing) for r in routes]
+    with frame(file=filename):
+        with PathReader(filename, threads=threads) as reader:
+            if cache is not None:
+                sections = cache.fetch_many(filename, plans, variables, reader)
+            else:
+                sections = reader.extract_many(plans, variables)
+        sections = [remap_section(section, vertical) for section in sections]
+
+        return [render_section(section, product, plan.start, plan.end, output.format(route=plan.name, product=product.name), fidelity, locator)
+                for plan, section in zip(plans, sections) for product in products]
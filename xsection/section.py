@@ -0,0 +1,80 @@
+"""
+Container for data extracted along a cross section path.
+"""
+
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import numpy as np
+
+
+#Set to any value to extract and derive fields in float64 instead of float32, for validation
+FLOAT64_ENV = 'XSECTION_FLOAT64'
+
+
+def field_dtype():
+    """
+    Float dtype of extracted fields and of everything derived from them.
+
+    GRIB fields are packed to around 16 bits, so float32 holds them exactly
+    and halves the memory and bandwidth of float64. The float64 mode is read
+    from the environment so that process-pool workers inherit it.
+    """
+    return np.dtype(np.float64 if os.environ.get(FLOAT64_ENV) else np.float32)
+
+
+@dataclass
+class Section:
+    """
+    Hybrid-level columns along a cross section path.
+
+    ``fields`` maps GRIB short names (``pres``, ``t``, ``q``, ``u``, ``v``,
+    ``w`` ...) to arrays of shape ``(levels, points)``; ``lat``/``lon`` hold
+    the coordinates of each path point.
+    """
+
+    fields: dict
+    lat: np.ndarray
+    lon: np.ndarray
+    init: datetime
+    valid: datetime
+    attrs: dict = field(default_factory=dict)
+    #Along-track distance of each path point (km)
+    distance: np.ndarray = None
+
+    def __getitem__(self, name):
+        return self.fields[name]
+
+    def __contains__(self, name):
+        return name in self.fields
+
+    @property
+    def levels(self):
+        return next(iter(self.fields.values())).shape[0]
+
+    @property
+    def points(self):
+        return len(self.lat)
+
+    def slice(self, start, stop, distance=None, **attrs):
+        """Section of the path points ``start:stop``, e.g. one path out of a stacked extraction."""
+        fields = {name: data[..., start:stop] for name, data in self.fields.items()}
+        if distance is None and self.distance is not None:
+            distance = self.distance[start:stop]
+        return Section(fields, self.lat[start:stop], self.lon[start:stop], self.init, self.valid, {**self.attrs, **attrs}, distance)
+
+    def save(self, file):
+        """Write the section to an uncompressed ``.npz`` file (or open file object)."""
+        arrays = {f'field_{name}': data for name, data in self.fields.items()}
+        if self.distance is not None:
+            arrays['distance'] = self.distance
+        np.savez(file, lat=self.lat, lon=self.lon, init=self.init.isoformat(), valid=self.valid.isoformat(), attrs=json.dumps(self.attrs), **arrays)
+
+    @classmethod
+    def load(cls, file):
+        """Read a section written by ``save``."""
+        with np.load(file) as npz:
+            fields = {name[6:]: npz[name] for name in npz.files if name.startswith('field_')}
+            return cls(fields, npz['lat'], npz['lon'], datetime.fromisoformat(str(npz['init'])), datetime.fromisoformat(str(npz['valid'])), json.loads(str(npz['attrs'])), npz['distance'] if 'distance' in npz.files else None)
@@ -0,0 +1,293 @@
+"""
+Long-running local render service that keeps forecast data warm in memory.
+
+A one-off render pays interpreter startup, the heavy imports and the GRIB
+open and decode before drawing anything. The service pays them once: forecast
+files stay open, decoded fields stay in a size-bounded LRU memory cache, and
+any path through a warm file is just a gather and a draw.
+
+Requests are plain HTTP GETs on localhost::
+
+    /section?start=40,-105&end=41,-90&product=wind&hour=16
+    /section?start=40,-105&end=41,-90&hour=16&format=npz&variables=t,theta_e
+    /status
+
+``format=png`` (the default) returns the rendered product, ``format=npz``
+the extracted Section as written by ``Section.save``. Renders default to the
+'fast' fidelity at SERVICE_DPI (100); pass ``fidelity=full`` for the
+fine-binned fill or ``dpi=200`` for the resolution of batch frames. On one
+core a warm request for the full HRRR grid measured about 0.3 s for
+temperature and rh and 0.9 s for wind, whose contour labels dominate (1.1 s
+at 200 dpi).
+"""
+
+import io
+import json
+import threading
+import warnings
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from .batch import forecast_files
+from .cache import file_identity
+from .grid import HRRRGrid
+from .path import Route, combine
+from .physics import derive, inputs_for
+from .products import get_product, variables_for
+from .reader import PathReader
+from .section import field_dtype
+from .render import render_section
+from .vertical import remap_section
+from .wind import wind_inputs
+
+
+#Default memory budget of decoded fields and sections (bytes)
+MAX_MEMORY_BYTES = 4*2**30
+
+#Resolution of rendered PNGs; savefig time grows with the pixel count
+SERVICE_DPI = 100
+
+
+class MemoryCache:
+    """Thread-safe LRU mapping bounded by the total ``nbytes`` of its values."""
+
+    def __init__(self, max_bytes=MAX_MEMORY_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return self._items[key][0]
+
+    def put(self, key, value, nbytes):
+        with self._lock:
+            if key in self._items:
+                self.nbytes -= self._items.pop(key)[1]
+            self._items[key] = (value, nbytes)
+            self.nbytes += nbytes
+            #Evict least recently used entries, but never the one just added
+            while self.nbytes > self.max_bytes and len(self._items) > 1:
+                _, (_, size) = self._items.popitem(last=False)
+                self.nbytes -= size
+
+    def stats(self):
+        return {'entries': len(self._items), 'bytes': self.nbytes, 'max_bytes': self.max_bytes, 'hits': self.hits, 'misses': self.misses}
+
+
+class MemoryReader(PathReader):
+    """
+    PathReader that decodes each variable whole once and gathers from memory.
+
+    Decoded fields are kept in a shared MemoryCache keyed by file identity and
+    variable, so later paths through the same file skip the GRIB decode. With
+    ``threads`` the levels of a cold field are decoded in parallel.
+    """
+
+    def __init__(self, filename, cache, threads=1):
+        super().__init__(filename, threads=threads)
+        self.cache = cache
+        self.identity = file_identity(filename)
+
+    def field(self, name):
+        """Whole decoded field of one variable, ``(levels, ny, nx)`` or ``(ny, nx)``."""
+        key = (self.identity, name)
+        data = self.cache.get(key)
+        if data is None:
+            da = self.ds[name]
+            if self.threads > 1 and da.ndim == 3:
+                data = np.empty(da.shape, dtype=field_dtype())
+                def decode(k):
+                    data[k] = self._thread_ds()[name][k].data
+                self.map(decode, range(da.shape[0]))
+            else:
+                data = np.asarray(da.data, dtype=field_dtype())
+            self.cache.put(key, data, data.nbytes)
+        return data
+
+    def read_columns(self, name, window, local, weights, levels=None):
+        data = self.field(name)[..., window[0], window[1]]
+        if levels is not None and data.ndim == 3:
+            data = data[levels]
+        return combine(data.reshape(data.shape[:-2] + (-1,))[..., local], weights)
+
+    def read_many(self, names, window, local, weights, levels=None):
+        #Gathers from memory are cheap; threads only help the decode in field
+        return {name: self.read_columns(name, window, local, weights, levels) for name in names}
+
+
+class SectionService:
+    """
+    Sections and rendered products for the forecast hours of one run, kept warm.
+
+    Files are resolved with batch.FILE_PATTERN under ``run_dir`` for ``cycle``.
+    ``max_bytes`` bounds the decoded fields held in memory; extracted sections
+    are cached separately under a tenth of it. GRIB decoding and matplotlib
+    are not thread-safe, so the work of each request runs under one lock while
+    the HTTP server accepts connections concurrently; within a request,
+    ``threads`` decode threads split up the levels of each cold field.
+    """
+
+    def __init__(self, run_dir, cycle, max_bytes=MAX_MEMORY_BYTES, grid=None, threads=1):
+        self.run_dir = run_dir
+        self.cycle = cycle
+        self.threads = threads
+        self.grid = grid or HRRRGrid()
+        self.fields = MemoryCache(max_bytes)
+        self.sections = MemoryCache(max_bytes//10)
+        self.lock = threading.Lock()
+        self._readers = {}
+        self._plans = {}
+
+    def filename(self, hour):
+        return forecast_files(self.run_dir, self.cycle, [hour])[0][1]
+
+    def reader(self, hour):
+        """Open MemoryReader of a forecast hour, reopened if the file was replaced."""
+        filename = self.filename(hour)
+        reader = self._readers.get(hour)
+        if reader is None or reader.identity != file_identity(filename):
+            if reader is not None:
+                reader.close()
+            reader = self._readers[hour] = MemoryReader(filename, self.fields, self.threads)
+        return reader
+
+    def plan(self, start, end, sampling='nearest', spacing=None):
+        key = (tuple(start), tuple(end), sampling, spacing)
+        if key not in self._plans:
+            self._plans[key] = Route('', tuple(start), tuple(end)).plan(self.grid, sampling=sampling, spacing=spacing)
+        return self._plans[key]
+
+    def section(self, hour, start, end, variables, sampling='nearest', spacing=None):
+        """Section of raw or derived ``variables`` along a straight path at one forecast hour."""
+        with self.lock:
+            reader = self.reader(hour)
+            plan = self.plan(start, end, sampling, spacing)
+            key = (reader.identity, plan.start, plan.end, plan.sampling, plan.spacing, tuple(variables))
+            section = self.sections.get(key)
+            if section is None:
+                section = reader.extract_plan(plan, inputs_for(variables))
+                section.fields = derive(section.fields, variables)
+                self.sections.put(key, section, sum(data.nbytes for data in section.fields.values()))
+            return section
+
+    def render(self, hour, start, end, product, fidelity='fast', vertical='native', sampling='nearest', spacing=None, dpi=SERVICE_DPI):
+        """PNG bytes of a product along a straight path at one forecast hour."""
+        product = get_product(product)
+        section = remap_section(self.section(hour, start, end, variables_for([product]), sampling, spacing), vertical)
+        buffer = io.BytesIO()
+        with self.lock:
+            render_section(section, product, start, end, buffer, fidelity, dpi=dpi)
+        return buffer.getvalue()
+
+    def preload(self, hours, products):
+        """
+        Decode the fields ``products`` need for ``hours`` ahead of the first request.
+
+        Only as many hours as fit in the field budget are decoded (preloading
+        more would just evict the first ones again), with a warning naming the
+        hours left out. Returns the hours preloaded.
+        """
+        names = wind_inputs(inputs_for(variables_for(products)))
+        hours = list(hours)
+        with self.lock:
+            if not hours:
+                return []
+            reader = self.reader(hours[0])
+            hour_bytes = sum(int(np.prod(reader.ds[name].shape)) for name in names)*field_dtype().itemsize
+            fit = self.fields.max_bytes//hour_bytes
+            if fit < len(hours):
+                warnings.warn(f'preloading {len(hours)} hours needs {len(hours)*hour_bytes/2**30:.1f} GiB of decoded fields '
+                              f'({hour_bytes/2**20:.0f} MiB per hour) but the memory budget is {self.fields.max_bytes/2**30:.1f} GiB; '
+                              f'preloading only hours {hours[:fit]}', stacklevel=2)
+                hours = hours[:fit]
+            for hour in hours:
+                reader = self.reader(hour)
+                for name in names:
+                    reader.field(name)
+        return hours
+
+    def status(self):
+        return {'run_dir': self.run_dir, 'cycle': self.cycle, 'hours': sorted(self._readers), 'plans': len(self._plans),
+                'fields': self.fields.stats(), 'sections': self.sections.stats()}
+
+    def close(self):
+        for reader in self._readers.values():
+            reader.close()
+        self._readers.clear()
+
+
+class SectionHandler(BaseHTTPRequestHandler):
+    """HTTP front end of a SectionService (set as the server's ``service``)."""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        service = self.server.service
+        try:
+            if url.path == '/status':
+                return self.reply(200, json.dumps(service.status()).encode(), 'application/json')
+            if url.path != '/section':
+                return self.reply(404, b'Not found\n', 'text/plain')
+
+            start, end = _coords(query['start']), _coords(query['end'])
+            hour = int(query['hour'])
+            sampling, spacing = query.get('sampling', 'nearest'), float(query['spacing']) if 'spacing' in query else None
+            if query.get('format', 'png') == 'npz':
+                variables = query['variables'].split(',') if 'variables' in query else variables_for([query.get('product', 'wind')])
+                section = service.section(hour, start, end, variables, sampling, spacing)
+                buffer = io.BytesIO()
+                section.save(buffer)
+                return self.reply(200, buffer.getvalue(), 'application/octet-stream')
+            dpi = int(query.get('dpi', SERVICE_DPI))
+            body = service.render(hour, start, end, query.get('product', 'wind'), query.get('fidelity', 'fast'), query.get('vertical', 'native'), sampling, spacing, dpi)
+            return self.reply(200, body, 'image/png')
+        except KeyError as e:
+            return self.reply(400, f'Missing or unknown parameter: {e}\n'.encode(), 'text/plain')
+        except ValueError as e:
+            return self.reply(400, f'{e}\n'.encode(), 'text/plain')
+        except FileNotFoundError as e:
+            return self.reply(404, f'{e}\n'.encode(), 'text/plain')
+        except Exception as e:
+            #e.g. a GRIB decode error on a file that is still being written
+            self.log_error('%s failed: %r', self.path, e)
+            return self.reply(500, f'{type(e).__name__}: {e}\n'.encode(), 'text/plain')
+
+    def reply(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _coords(value):
+    lat, lon = value.split(',')
+    return (float(lat), float(lon))
+
+
+def serve(service, host='127.0.0.1', port=8765):
+    """Serve ``service`` over HTTP until interrupted."""
+    server = ThreadingHTTPServer((host, port), SectionHandler)
+    server.service = service
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
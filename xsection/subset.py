@@ -0,0 +1,136 @@
+"""
+Byte-range subsetting of HRRR GRIB2 files using their ``.idx`` inventories.
+
+NOMADS publishes an inventory next to every GRIB2 file, one line per message::
+
+    1:0:d=2022122418:PRES:1 hybrid level:16 hour fcst:
+
+giving the message number, its byte offset, the variable and the level. A
+cross section only needs a handful of hybrid-level variables, so instead of
+transferring and decoding the whole ~700 MB file, only those messages are
+read (HTTP Range requests for URLs, seek-and-read for local files) and written
+back to back into a slim GRIB2 file that ``open_hybrid`` reads as usual.
+"""
+
+import os
+import shutil
+import urllib.request
+from dataclasses import dataclass
+
+from .wind import wind_inputs
+
+
+#cfgrib short names -> inventory variable names
+IDX_NAMES = {'pres': 'PRES', 't': 'TMP', 'q': 'SPFH', 'u': 'UGRD', 'v': 'VGRD', 'w': 'VVEL', 'gh': 'HGT'}
+
+#Copy buffer size for range reads (bytes)
+CHUNK = 2**20
+
+
+@dataclass
+class IdxEntry:
+    """One message of a GRIB2 inventory."""
+
+    number: int
+    offset: int
+    #Offset of the last byte of the message, None for the last message of the file
+    end: int
+    variable: str
+    level: str
+
+
+def parse_idx(text):
+    """Parse the text of a ``.idx`` inventory into IdxEntries."""
+    entries = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        number, offset, _, variable, level = line.split(':')[:5]
+        entries.append(IdxEntry(int(number), int(offset), None, variable, level))
+    for entry, following in zip(entries, entries[1:]):
+        entry.end = following.offset - 1
+    return entries
+
+
+def select(entries, variables, level_type='hybrid level'):
+    """Entries of the given cfgrib variables on levels of ``level_type``."""
+    wanted = {IDX_NAMES.get(v, v.upper()) for v in wind_inputs(variables)}
+    return [e for e in entries if e.variable in wanted and e.level.endswith(level_type)]
+
+
+def byte_ranges(entries):
+    """Merge the byte spans of adjacent messages into as few (start, end) ranges as possible."""
+    ranges = []
+    for entry in sorted(entries, key=lambda e: e.offset):
+        if ranges and ranges[-1][1] is not None and ranges[-1][1] + 1 == entry.offset:
+            ranges[-1] = (ranges[-1][0], entry.end)
+        else:
+            ranges.append((entry.offset, entry.end))
+    return ranges
+
+
+def is_url(source):
+    return source.startswith(('http://', 'https://'))
+
+
+def read_text(source, urlopen=urllib.request.urlopen):
+    """Contents of a local file or URL as text."""
+    if is_url(source):
+        with urlopen(source) as response:
+            return response.read().decode()
+    with open(source) as f:
+        return f.read()
+
+
+def copy_range(source, start, end, out, urlopen=urllib.request.urlopen):
+    """
+    Copy bytes ``start``..``end`` (inclusive, None for end of file) of a file or URL to ``out``.
+
+    Returns the number of bytes copied.
+    """
+    if is_url(source):
+        request = urllib.request.Request(source, headers={'Range': f'bytes={start}-{"" if end is None else end}'})
+        with urlopen(request) as response:
+            if getattr(response, 'status', 206) != 206:
+                raise OSError(f'{source} ignored the byte range request (HTTP {response.status})')
+            return _copy(response, out, None)
+    with open(source, 'rb') as f:
+        f.seek(start)
+        return _copy(f, out, None if end is None else end - start + 1)
+
+
+def _copy(src, out, length):
+    copied = 0
+    while length is None or copied < length:
+        chunk = src.read(CHUNK if length is None else min(CHUNK, length - copied))
+        if not chunk:
+            break
+        out.write(chunk)
+        copied += len(chunk)
+    return copied
+
+
+def fetch_subset(source, dest, variables, idx=None, level_type='hybrid level', urlopen=urllib.request.urlopen):
+    """
+    Write only the messages of ``variables`` from a GRIB2 file or URL into ``dest``.
+
+    ``idx`` is the inventory location, ``source + '.idx'`` by default. The file
+    is written to a temporary name and moved into place, so a partial
+    download never looks like a complete subset. Returns the bytes written.
+    """
+    entries = select(parse_idx(read_text(idx or source + '.idx', urlopen)), variables, level_type)
+    if not entries:
+        raise ValueError(f'No {level_type} messages for {", ".join(variables)} in the inventory of {source}')
+
+    tmp = f'{dest}.part'
+    written = 0
+    with open(tmp, 'wb') as out:
+        for start, end in byte_ranges(entries):
+            written += copy_range(source, start, end, out, urlopen)
+    shutil.move(tmp, dest)
+    return written
+
+
+def subset_name(source, out_dir):
+    """Local file name for the subset of ``source`` in ``out_dir``."""
+    return os.path.join(out_dir, os.path.basename(source.rstrip('/')))
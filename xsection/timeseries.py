@@ -0,0 +1,120 @@
+"""
+Time-height and time-distance sections streamed over the forecast hours of a run.
+
+Files are visited lazily one at a time, only the needed column or path slice
+is pulled from each, and it is copied into an array preallocated for the whole
+run, so memory stays flat however many forecast hours are included. Forecast
+hours whose file is missing are left as NaN rows with a valid time of None.
+"""
+
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import numpy as np
+
+from .grid import HRRRGrid
+from .path import PathPlan
+from .physics import derive, inputs_for
+from .reader import PathReader
+
+
+@dataclass
+class TimeSection:
+    """
+    Fields stacked over forecast hours.
+
+    ``fields`` maps variable names to arrays whose first axis is time: shape
+    ``(times, levels)`` for a time-height section, ``(times, points)`` for a
+    time-distance one.
+    """
+
+    fields: dict
+    init: datetime
+    valid: list
+    lat: np.ndarray
+    lon: np.ndarray
+    distance: np.ndarray = None
+    attrs: dict = field(default_factory=dict)
+
+    def __getitem__(self, name):
+        return self.fields[name]
+
+    def save(self, file):
+        """Write to an ``.npz`` file."""
+        arrays = {f'field_{name}': data for name, data in self.fields.items()}
+        if self.distance is not None:
+            arrays['distance'] = self.distance
+        np.savez(file, lat=self.lat, lon=self.lon, init=self.init.isoformat(), valid=np.array([v.isoformat() if v else '' for v in self.valid]), attrs=json.dumps(self.attrs), **arrays)
+
+
+def iter_sections(files, plan, variables, levels=None):
+    """
+    Lazily yield the Section of ``variables`` (raw or derived) along ``plan`` for each file.
+
+    Only one file is open, and only its path columns (on the ``levels`` slice,
+    if given) are held, at any time. Missing files yield None.
+    """
+    raw = inputs_for(variables)
+    for filename in files:
+        if not os.path.exists(filename):
+            yield None
+            continue
+        with PathReader(filename) as reader:
+            section = reader.extract_plan(plan, raw, levels)
+        section.fields = derive(section.fields, variables)
+        yield section
+
+
+def stream_into(sections, count, select):
+    """
+    Copy ``select(section)`` (a dict of arrays) from each of ``count`` sections into preallocated arrays.
+
+    The output arrays are allocated from the first section; returns them with
+    the first section and the valid times. None sections (missing files) keep
+    their NaN rows and a None valid time.
+    """
+    out, first, valid = {}, None, []
+    for i, section in enumerate(sections):
+        if section is None:
+            valid.append(None)
+            continue
+        values = select(section)
+        if first is None:
+            first = section
+            out = {name: np.full((count,) + data.shape, np.nan, dtype=data.dtype) for name, data in values.items()}
+        for name, data in values.items():
+            out[name][i] = data
+        valid.append(section.valid)
+    if first is None:
+        raise ValueError('No forecast files to stream')
+    return out, first, valid
+
+
+def time_height(files, lat, lon, variables, grid=None):
+    """
+    Time-height section of ``variables`` at the grid point nearest (lat, lon).
+
+    Returns a TimeSection with fields shaped ``(times, levels)``; ``pres`` is
+    always included so the levels can be placed on a pressure axis.
+    """
+    grid = grid or HRRRGrid()
+    iy, ix = grid.latlon_to_index(np.atleast_1d(lat), np.atleast_1d(lon))
+    plan = PathPlan.from_indexes(iy, ix, grid.shape, name='point', start=(lat, lon), end=(lat, lon))
+    names = list(variables) + ([] if 'pres' in variables else ['pres'])
+
+    fields, first, valid = stream_into(iter_sections(files, plan, names), len(files), lambda s: {name: s[name][:, 0] for name in names})
+    return TimeSection(fields, first.init, valid, first.lat, first.lon, attrs={'kind': 'time-height'})
+
+
+def time_distance(files, plan, variables, level):
+    """
+    Hovmöller-style time-distance section of ``variables`` on one hybrid ``level`` along ``plan``.
+
+    Only ``level`` is decoded from each file. Returns a TimeSection with
+    fields shaped ``(times, points)``.
+    """
+    sections = iter_sections(files, plan, variables, slice(level, level+1))
+    fields, first, valid = stream_into(sections, len(files), lambda s: {name: s[name][0] for name in variables})
+    return TimeSection(fields, first.init, valid, first.lat, first.lon, plan.distance, attrs={'kind': 'time-distance', 'route': plan.name, 'level': level})
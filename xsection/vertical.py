@@ -0,0 +1,93 @@
+"""
+Vertical remap of hybrid-level sections onto fixed isobaric or height levels.
+
+Native hybrid levels follow the terrain, so every section has its own
+irregular mesh. Interpolating each column onto a fixed set of levels gives
+regular arrays that are cheaper to render and cache, and that can be
+differenced or averaged across times.
+"""
+
+import numpy as np
+
+from .profiling import timed
+from .section import Section
+
+
+#Default target levels
+PRESSURE_LEVELS = np.arange(1050, 49, -10)  # hPa
+HEIGHT_LEVELS = np.arange(0, 16001, 250)  # m
+
+#Vertical coordinates a section can be drawn on
+VERTICALS = ('native', 'pressure', 'height')
+
+
+def remap_columns(coord, values, targets, log=False):
+    """
+    Linearly interpolate columns of ``values`` from ``coord`` onto ``targets``.
+
+    ``coord`` and ``values`` are ``(levels, points)``; the coordinate may
+    increase or decrease with level and is forced monotonic where it wobbles.
+    With ``log`` the interpolation is linear in the log of the coordinate.
+    Targets outside a column's range (below ground, above the model top) are
+    NaN. Returns ``(len(targets), points)`` in the dtype of ``values``, all
+    columns in one pass; the coordinate math is done in float64.
+    """
+    coord = np.asarray(coord, dtype=np.float64)
+    values = np.asarray(values)
+    targets = np.asarray(targets, dtype=np.float64)
+
+    #Make the coordinate increase with level index
+    if np.nanmean(coord[0]) > np.nanmean(coord[-1]):
+        coord, values = coord[::-1], values[::-1]
+    coord = np.maximum.accumulate(coord, axis=0)
+    if log:
+        coord, targets = np.log(coord), np.log(targets)
+
+    #Index of the level just above each target in each column
+    above = (coord[:, None, :] <= targets[None, :, None]).sum(axis=0)
+    inside = ((above > 0) & (above < len(coord))) | (targets[:, None] == coord[-1])
+    k1 = np.clip(above, 1, len(coord)-1)
+    k0 = k1 - 1
+
+    points = np.arange(coord.shape[1])
+    c0, c1 = coord[k0, points], coord[k1, points]
+    v0, v1 = values[k0, points], values[k1, points]
+    span = c1 - c0
+    w = np.divide(targets[:, None] - c0, span, out=np.zeros_like(span), where=span > 0).astype(values.dtype, copy=False)
+
+    out = v1 - v0
+    out *= w
+    out += v0
+    out[~inside] = np.nan
+    return out
+
+
+@timed('remap')
+def remap_section(section, vertical='pressure', levels=None):
+    """
+    Section with every field remapped onto fixed ``levels``.
+
+    ``vertical`` is 'pressure' (levels in hPa, interpolated in log pressure) or
+    'height' (levels in m, needs the ``gh`` field). The ``pres`` field of the
+    result holds the pressure at each target point, so it plots like any other
+    section; for pressure levels it is simply the target levels.
+    """
+    if vertical == 'native':
+        return section
+    if vertical == 'pressure':
+        levels = PRESSURE_LEVELS if levels is None else np.asarray(levels)
+        coord, targets, log = section['pres'], levels*100.0, True
+    elif vertical == 'height':
+        if 'gh' not in section:
+            raise ValueError("Remapping to height needs the geopotential height ('gh') field")
+        levels = HEIGHT_LEVELS if levels is None else np.asarray(levels)
+        coord, targets, log = section['gh'], levels, False
+    else:
+        raise ValueError(f"Unknown vertical coordinate '{vertical}', choose from: {', '.join(VERTICALS)}")
+
+    fields = {name: remap_columns(coord, data, targets, log) for name, data in section.fields.items() if data.ndim == 2}
+    if vertical == 'pressure':
+        #Exact target pressures, keeping the below-ground mask
+        fields['pres'] = np.where(np.isnan(fields['pres']), np.nan, targets[:, None]).astype(fields['pres'].dtype)
+    attrs = {**section.attrs, 'vertical': vertical, 'levels': [float(l) for l in levels]}
+    return Section(fields, section.lat, section.lon, section.init, section.valid, attrs, section.distance)
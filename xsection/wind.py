@@ -0,0 +1,70 @@
+"""
+Wind components relative to a cross section.
+
+HRRR u/v are grid-relative: they point along the Lambert Conformal x/y axes
+rather than east/north. Components along and across the section only need the
+path's tangent in that same projected frame. Earth-relative components also
+need the angle between grid north and true north at each sample, which the
+PathPlan precomputes along with the tangent.
+"""
+
+import numpy as np
+
+
+#Section fields computed from u/v and the path geometry
+#  along   - wind along the path, positive from start to end
+#  normal  - wind across the path, positive from right to left looking from start to end
+#  speed   - wind speed (the same in the grid and earth frames)
+#  u_earth, v_earth - eastward and northward wind
+WIND_COMPONENTS = ('along', 'normal', 'speed', 'u_earth', 'v_earth')
+
+
+def path_tangent(px, py):
+    """Unit tangent ``(points, 2)`` of a path through projected points, in the grid frame."""
+    px, py = np.asarray(px, dtype=np.float64), np.asarray(py, dtype=np.float64)
+    if len(px) < 2:
+        return np.tile([1.0, 0.0], (len(px), 1))
+    tangent = np.stack([np.gradient(px), np.gradient(py)], axis=-1)
+    norm = np.hypot(tangent[:, 0], tangent[:, 1])[:, None]
+    return np.divide(tangent, norm, out=np.tile([1.0, 0.0], (len(px), 1)), where=norm > 0)
+
+
+def wind_inputs(variables):
+    """Variables to read for ``variables``, with wind components replaced by u and v."""
+    out = []
+    for name in variables:
+        for v in ('u', 'v') if name in WIND_COMPONENTS else (name,):
+            if v not in out:
+                out.append(v)
+    return out
+
+
+def wind_components(u, v, tangent, rotation=None, names=WIND_COMPONENTS):
+    """
+    Wind components of grid-relative ``u``/``v`` (``(levels, points)``) along a path.
+
+    ``tangent`` is the path's unit tangent per sample in the grid frame and
+    ``rotation`` the grid rotation angle per sample (radians); each is applied
+    across all levels at once. Returns a dict of the requested ``names``.
+    """
+    out = {}
+    tx, ty = tangent[:, 0].astype(u.dtype), tangent[:, 1].astype(u.dtype)
+    if 'along' in names:
+        out['along'] = u*tx
+        out['along'] += v*ty
+    if 'normal' in names:
+        out['normal'] = v*tx
+        out['normal'] -= u*ty
+    if 'speed' in names:
+        out['speed'] = np.hypot(u, v)
+    if 'u_earth' in names or 'v_earth' in names:
+        if rotation is None:
+            raise ValueError('Earth-relative wind needs a plan with grid rotation angles')
+        cos, sin = np.cos(rotation).astype(u.dtype), np.sin(rotation).astype(u.dtype)
+        if 'u_earth' in names:
+            out['u_earth'] = u*cos
+            out['u_earth'] += v*sin
+        if 'v_earth' in names:
+            out['v_earth'] = v*cos
+            out['v_earth'] -= u*sin
+    return out